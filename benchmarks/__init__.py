@@ -0,0 +1,4 @@
+"""
+Benchmarks for the paint and input paths, they run on a headless
+terminal, see benchmarks/__main__.py for how to run them.
+"""
@@ -0,0 +1,81 @@
+"""
+Runs the benchmarks and prints the results as JSON, ie:
+
+    python -m benchmarks --quick
+    python -m benchmarks --only list,latency --list-sizes 1000,100000 -o results.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from . import bench_file, bench_latency, bench_list, bench_text, bench_width
+
+BENCHMARKS = {
+    "list": bench_list,
+    "text": bench_text,
+    "width": bench_width,
+    "file": bench_file,
+    "latency": bench_latency,
+}
+
+
+def _sizes(value: str):
+    return [int(size) for size in value.split(",")]
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", help="comma separated benchmarks to run: " + ",".join(BENCHMARKS))
+    parser.add_argument("--quick", action="store_true", help="small sizes, for a smoke run")
+    parser.add_argument("--list-sizes", type=_sizes, help="list item counts, default 1000,100000,10000000")
+    parser.add_argument("--text-mb", type=float, help="megabytes of text for the text view, default 100")
+    parser.add_argument("--dir-entries", type=int, help="files in the listed directory, default 50000")
+    parser.add_argument("--width-strings", type=int, help="strings measured for width, default 100000")
+    parser.add_argument("--repeat", type=int, help="times each operation is measured, default 100")
+    parser.add_argument("--width", type=int, default=120, help="terminal columns")
+    parser.add_argument("--height", type=int, default=60, help="terminal rows")
+    parser.add_argument("-o", "--output", help="file to write the results to, stdout by default")
+    config = parser.parse_args(argv)
+
+    defaults = {
+        "list_sizes": [1000, 100000, 10000000],
+        "text_mb": 100,
+        "dir_entries": 50000,
+        "width_strings": 100000,
+        "repeat": 100,
+    }
+    if config.quick:
+        defaults = {"list_sizes": [1000, 10000], "text_mb": 1, "dir_entries": 1000, "width_strings": 1000, "repeat": 10}
+    for name, value in defaults.items():
+        if getattr(config, name) is None:
+            setattr(config, name, value)
+    return config
+
+
+def main(argv=None):
+    config = _parse_args(argv)
+    names = config.only.split(",") if config.only else list(BENCHMARKS)
+    results = []
+    for name in names:
+        print(f"Running {name}", file=sys.stderr)
+        results += BENCHMARKS[name].run(config)
+
+    report = {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {name: value for name, value in vars(config).items() if name != "output"},
+        "results": results,
+    }
+    if config.output:
+        with open(config.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
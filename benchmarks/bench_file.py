@@ -0,0 +1,34 @@
+import os
+import shutil
+import tempfile
+from typing import List
+
+from cdtui import FileChooser, kbd
+
+from .common import Bench, result, timed
+
+
+def run(config) -> List[dict]:
+    path = tempfile.mkdtemp(prefix="cdtui-bench-")
+    try:
+        for i in range(config.dir_entries):
+            os.close(os.open(os.path.join(path, f"file-{i:08}.txt"), os.O_CREAT | os.O_WRONLY))
+        bench = Bench(config.width, config.height)
+        results = []
+        bench.run(_measure, bench, path, config, results)
+        return results
+    finally:
+        shutil.rmtree(path)
+
+
+def _measure(bench: Bench, path: str, config, results: List[dict]):
+    params = {"entries": config.dir_entries, "width": config.width, "height": config.height}
+    choosers = []
+
+    results.append(result("file.list_directory", params, [timed(lambda: choosers.append(FileChooser(path=path)))]))
+
+    chooser = choosers[0]
+    bench.set_view(chooser)
+    results.append(bench.measure("file.repaint", config.repeat, bench.app.refresh, params))
+
+    results.append(bench.measure("file.page_down", config.repeat, lambda: chooser.on_key_press(kbd.KEY_PGDN), params))
@@ -0,0 +1,38 @@
+import time
+from typing import List
+
+from cdtui import KeyScript, ListView, kbd
+
+from .common import Bench, RangeModel, result
+
+
+def run(config) -> List[dict]:
+    """
+    Time from a key sent to the terminal until the frame it causes is
+    flushed, going through the whole main loop.
+    """
+    bench = Bench(config.width, config.height)
+    bench.set_view(ListView(model=RangeModel(config.repeat * 2 + config.height)))
+
+    sent = []
+    flushed = []
+    frame_bytes = []
+
+    def press():
+        sent.append(time.perf_counter())
+        bench.terminal.send(kbd.KEY_DOWN)
+
+    def on_flush(_, frame):
+        if len(flushed) < len(sent):
+            flushed.append(time.perf_counter())
+            frame_bytes.append(len(frame.encode()))
+
+    bench.terminal.on_flush.add(on_flush)
+    script = KeyScript(bench.terminal)
+    for _ in range(config.repeat):
+        script.call(press)
+    script.run(bench.app)
+
+    params = {"width": config.width, "height": config.height}
+    latencies = [end - start for start, end in zip(sent, flushed)]
+    return [result("latency.key_to_flush", params, latencies, sum(frame_bytes) / len(frame_bytes))]
@@ -0,0 +1,28 @@
+from typing import List
+
+from cdtui import ListView, kbd
+
+from .common import Bench, RangeModel
+
+
+def run(config) -> List[dict]:
+    results = []
+    for count in config.list_sizes:
+        bench = Bench(config.width, config.height)
+        view = ListView(model=RangeModel(count))
+        bench.set_view(view)
+        bench.run(_measure, bench, view, count, config, results)
+    return results
+
+
+def _measure(bench: Bench, view: ListView, count: int, config, results: List[dict]):
+    params = {"items": count, "width": config.width, "height": config.height}
+
+    results.append(bench.measure("list.repaint", config.repeat, bench.app.refresh, params))
+
+    # Cursor on the last visible row, so every step scrolls
+    view.on_key_repeat(kbd.KEY_DOWN, config.height)
+    bench.app.empty_queue()
+    results.append(bench.measure("list.scroll_down", config.repeat, lambda: view.on_key_press(kbd.KEY_DOWN), params))
+
+    results.append(bench.measure("list.page_down", config.repeat, lambda: view.on_key_press(kbd.KEY_PGDN), params))
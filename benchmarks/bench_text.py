@@ -0,0 +1,39 @@
+from typing import List
+
+from cdtui import TextView, kbd
+
+from .common import Bench, result, timed
+
+_LINE = "{:>9} The quick brown fox jumps over the lazy dog, ñandú, 日本語のテキスト"
+
+
+def _make_text(size: int) -> str:
+    lines = []
+    length = 0
+    while length < size:
+        line = _LINE.format(len(lines))
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)
+
+
+def run(config) -> List[dict]:
+    size = int(config.text_mb * 1024 * 1024)
+    text = _make_text(size)
+    bench = Bench(config.width, config.height)
+    view = TextView()
+    bench.set_view(view)
+    results = []
+    bench.run(_measure, bench, view, text, config, results)
+    return results
+
+
+def _measure(bench: Bench, view: TextView, text: str, config, results: List[dict]):
+    params = {"text_mb": config.text_mb, "width": config.width, "height": config.height}
+
+    results.append(result("text.set_text", params, [timed(view.set_text, text)]))
+    bench.app.empty_queue()
+
+    results.append(bench.measure("text.page_down", config.repeat, lambda: view.on_key_press(kbd.KEY_PGDN), params))
+
+    results.append(bench.measure("text.scroll_down", config.repeat, lambda: view.on_key_press(kbd.KEY_DOWN), params))
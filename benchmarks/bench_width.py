@@ -0,0 +1,41 @@
+import time
+from typing import List
+
+from cdtui import ansi
+
+from .common import result
+
+# Fewer than the width cache holds
+_REPEATED = 1000
+
+_SAMPLES = [
+    "plain ascii text of a list row",
+    "\u001b[4munderlined\u001b[0m ascii with escapes",
+    "ñandú, café, naïve, é with accents and combining marks",
+    "日本語のテキストと English mixed",
+    "emoji 🚀🎉 and \u001b[38;5;208mcolors\u001b[0m 漢字",
+]
+
+
+def run(config) -> List[dict]:
+    results = []
+    count = config.width_strings
+    # Builds the width tables
+    _time_all(_SAMPLES)
+    for sample in _SAMPLES:
+        # Distinct strings measure the width computation, a few repeated
+        # ones the cache in front of it.
+        strings = [f"{sample} {n}" for n in range(count)]
+        repeated = strings[:_REPEATED] * (count // _REPEATED or 1)
+        params = {"sample": sample, "strings": count}
+        results.append(result("width.ansi_string_len.uncached", params, [_time_all(strings)], calls=len(strings)))
+        results.append(result("width.ansi_string_len.cached", params, [_time_all(repeated)], calls=len(repeated)))
+    return results
+
+
+def _time_all(strings: List[str]) -> float:
+    string_len = ansi._ansi_string_len
+    start = time.perf_counter()
+    for string in strings:
+        string_len(string)
+    return time.perf_counter() - start
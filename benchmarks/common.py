@@ -0,0 +1,86 @@
+import time
+from typing import Callable, List, Optional
+
+from cdtui import Application, HeadlessTerminal, KeyScript, ListModel, Rect
+
+
+class RangeModel(ListModel):
+    """
+    List model with generated items, so huge lists take no memory
+    """
+
+    def __init__(self, count: int):
+        super().__init__()
+        self._count = count
+
+    def get_item_count(self) -> int:
+        return self._count
+
+    def get_item(self, index: int) -> str:
+        return f"item {index:>10} | some text to fill the row a bit"
+
+
+class Bench:
+    """
+    An application on a headless terminal with a single view filling it
+    and no frame rate cap, so every empty_queue() paints.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.terminal = HeadlessTerminal(width, height)
+        self.app = Application(terminal=self.terminal)
+        self.app.max_fps = 0
+        self.view = None
+
+    def set_view(self, view):
+        self.view = view
+        self.app.add_component(view)
+        height, width = self.terminal.size()
+        view.set_rect(Rect(1, 1, width, height))
+        view.set_focused(True)
+
+    def run(self, callback: Callable, *args):
+        """
+        Runs callback(*args) on the main loop once the first frame is out
+        """
+        KeyScript(self.terminal).call(callback, *args).run(self.app)
+
+    def measure(self, name: str, repeat: int, action: Callable, params: dict) -> dict:
+        """
+        Calls action() and paints the queued views repeat times,
+        the results include the time and bytes output by each one.
+        """
+        times = []
+        bytes_before = self.terminal.bytes_written
+        for _ in range(repeat):
+            start = time.perf_counter()
+            action()
+            self.app.empty_queue()
+            times.append(time.perf_counter() - start)
+        bytes_written = self.terminal.bytes_written - bytes_before
+        return result(name, params, times, bytes_written / repeat)
+
+
+def result(name: str, params: dict, times: List[float], bytes_written: Optional[float] = None, **extra) -> dict:
+    times = sorted(times)
+    record = {
+        "name": name,
+        "params": params,
+        "repeat": len(times),
+        "wall_time": {
+            "min": times[0],
+            "median": times[len(times) // 2],
+            "mean": sum(times) / len(times),
+            "max": times[-1],
+        },
+    }
+    if bytes_written is not None:
+        record["bytes"] = bytes_written
+    record.update(extra)
+    return record
+
+
+def timed(action: Callable, *args) -> float:
+    start = time.perf_counter()
+    action(*args)
+    return time.perf_counter() - start
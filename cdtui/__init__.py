@@ -1,11 +1,14 @@
 from .base import Point, Dimension, Rect, COLORS
+from .theme import set_theme, get_theme, invalidate as invalidate_theme
 from .app import Application
 from .view import View
 from .titled import TitledView
-from .list import ListModel, ListView, DefaultListModel
+from .list import ListModel, ListView, DefaultListModel, LazyListModel
 from .tabbed import TabbedView
 from .text import TextView
 from .file import FileChooser
 from .dialog import QuestionDialog, InputDialog
 from .tree import TreeView, TreeModel
 from .listener import ListenerHandler
+from .layout import HBox, VBox, Grid, Fixed, Percent, Flex
+from .headless import HeadlessTerminal, KeyScript
@@ -1,7 +1,12 @@
-import subprocess
+import fcntl
+import functools
+import shutil
+import struct
 import sys
-import unicodedata
-from typing import Tuple
+import termios
+from typing import NamedTuple, Optional, Tuple
+
+from . import width
 
 UNDERLINE = "\u001b[4m"
 BOLD = "\u001b[1m"
@@ -10,105 +15,317 @@ RESET = "\u001b[0m"
 CLRSCR = "\u001b[2J"
 CURSOR_OFF = "\033[?25l"
 CURSOR_ON = "\033[?25h"
+SYNC_BEGIN = "\033[?2026h"
+SYNC_END = "\033[?2026l"
+
+# Where UiWriter.put() sends its output, anything with a write(str) method,
+# None means straight to stdout.
+_output = None
+
+
+def set_output(output):
+    global _output
+    _output = output
+
+
+def get_output():
+    return _output
 
 
 class UiWriter:
+    """
+    Builds a piece of terminal output, fragments are kept in a list
+    and joined once.
+    """
+
     def __init__(self):
-        self._buffer = ""
+        self._parts = []
 
     def cursor_off(self) -> "UiWriter":
-        self._buffer += CURSOR_OFF
+        self._parts.append(CURSOR_OFF)
         return self
 
     def cursor_on(self) -> "UiWriter":
-        self._buffer += CURSOR_ON
+        self._parts.append(CURSOR_ON)
         return self
 
     def clrscr(self) -> "UiWriter":
-        self._buffer += CLRSCR
+        self._parts.append(CLRSCR)
         return self
 
     def underline(self) -> "UiWriter":
-        self._buffer += UNDERLINE
+        self._parts.append(UNDERLINE)
         return self
 
     def reverse(self) -> "UiWriter":
-        self._buffer += REVERSE
+        self._parts.append(REVERSE)
         return self
 
     def bold(self) -> "UiWriter":
-        self._buffer += BOLD
+        self._parts.append(BOLD)
         return self
 
     def reset(self) -> "UiWriter":
-        self._buffer += RESET
+        self._parts.append(RESET)
         return self
 
     def gotoxy(self, x: int, y: int) -> "UiWriter":
-        self._buffer += f"\u001b[{y};{x}H"
+        self._parts.append(cup(x, y))
+        return self
+
+    def scroll(self, top: int, bottom: int, lines: int) -> "UiWriter":
+        """
+        Scrolls the rows from top to bottom, 1 based, up by lines or down
+        if negative. The cursor ends up at the home position.
+        """
+        self._parts.append(scroll_region(top, bottom, lines))
         return self
 
     def write(self, string: str) -> "UiWriter":
-        self._buffer += string
+        self._parts.append(string)
         return self
 
     def writefill(self, string: str, length: int, fillchar: str = " ") -> "UiWriter":
         str_len = _ansi_string_len(string)
-        self._buffer += string + fillchar * (length - str_len)
+        self._parts.append(string)
+        if length > str_len:
+            self._parts.append(fillchar * (length - str_len))
         return self
 
     def fg(self, color: int) -> "UiWriter":
-        self._buffer += f"\u001b[38;5;{color}m"
+        self._parts.append(fg_color(color))
         return self
 
     def bg(self, color: int) -> "UiWriter":
-        self._buffer += f"\u001b[48;5;{color}m"
+        self._parts.append(bg_color(color))
         return self
 
     def put(self):
+        if _output is not None:
+            _output.write(str(self))
+            return
         try:
-            sys.stdout.write(self._buffer)
+            sys.stdout.write(str(self))
             sys.stdout.flush()
         except Exception:
             pass
 
+    def write_to(self, buffer: bytearray, offset: int = 0) -> int:
+        """
+        Copies the encoded output into a preallocated buffer at the given
+        offset, growing it only if it doesn't fit, and returns the offset
+        where the output ends.
+        """
+        return copy_into(buffer, offset, str(self).encode())
+
     def trunc(self, length: int) -> "UiWriter":
-        while len(self) > length:
-            self._buffer = self._buffer[0:-1]
+        self._parts = [width.truncate(str(self), length)]
         return self
 
     def __str__(self) -> str:
-        return self._buffer
+        parts = self._parts
+        if len(parts) == 1:
+            return parts[0]
+        value = "".join(parts)
+        self._parts = [value]
+        return value
 
     def __len__(self) -> int:
-        return _ansi_string_len(self._buffer)
+        return _ansi_string_len(str(self))
+
+
+def copy_into(buffer: bytearray, offset: int, data: bytes) -> int:
+    end = offset + len(data)
+    if end > len(buffer):
+        buffer.extend(bytes(max(end - len(buffer), len(buffer))))
+    buffer[offset:end] = data
+    return end
+
+
+@functools.lru_cache(maxsize=4096)
+def cup(x: int, y: int) -> str:
+    """
+    Returns the sequence that moves the cursor to column x, row y
+    """
+    return f"\u001b[{y};{x}H"
+
+
+def scroll_region(top: int, bottom: int, lines: int) -> str:
+    """
+    Returns the sequence that sets a scroll region, scrolls it and
+    resets it to the whole screen.
+    """
+    scroll = f"\u001b[{lines}S" if lines > 0 else f"\u001b[{-lines}T"
+    return f"\u001b[{top};{bottom}r{scroll}\u001b[r"
+
+
+@functools.lru_cache(maxsize=256)
+def fg_color(color: int) -> str:
+    return f"\u001b[38;5;{color}m"
+
+
+@functools.lru_cache(maxsize=256)
+def bg_color(color: int) -> str:
+    return f"\u001b[48;5;{color}m"
+
+
+class SgrState(NamedTuple):
+    """
+    Graphic rendition attributes in effect, colors are kept as the SGR
+    parameters that set them, ie "38;5;255", empty for the default.
+    """
+
+    fg: str = ""
+    bg: str = ""
+    bold: bool = False
+    dim: bool = False
+    italic: bool = False
+    underline: bool = False
+    reverse: bool = False
+
+
+DEFAULT_SGR = SgrState()
+
+_SGR_FLAGS = {
+    "1": ("bold", True),
+    "2": ("dim", True),
+    "3": ("italic", True),
+    "4": ("underline", True),
+    "7": ("reverse", True),
+    "23": ("italic", False),
+    "24": ("underline", False),
+    "27": ("reverse", False),
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def sgr_apply(state: SgrState, params: str) -> SgrState:
+    """
+    Returns the state after a SGR sequence with the given parameters.
+    """
+    values = params.split(";") if params else ["0"]
+    fields = state._asdict()
+    i = 0
+    while i < len(values):
+        value = values[i] or "0"
+        if value == "0":
+            fields = DEFAULT_SGR._asdict()
+        elif value in ("38", "48"):
+            # Extended colors, 5;n or 2;r;g;b
+            length = 3 if values[i + 1 : i + 2] == ["5"] else 5
+            fields["fg" if value == "38" else "bg"] = ";".join(values[i : i + length])
+            i += length - 1
+        elif value == "39":
+            fields["fg"] = ""
+        elif value == "49":
+            fields["bg"] = ""
+        elif value == "22":
+            fields["bold"] = fields["dim"] = False
+        elif value in _SGR_FLAGS:
+            name, flag = _SGR_FLAGS[value]
+            fields[name] = flag
+        elif value.isdigit():
+            code = int(value)
+            if 30 <= code <= 37 or 90 <= code <= 97:
+                fields["fg"] = value
+            elif 40 <= code <= 47 or 100 <= code <= 107:
+                fields["bg"] = value
+        i += 1
+    return SgrState(**fields)
+
+
+def _sgr_params(state: SgrState):
+    params = []
+    if state.bold:
+        params.append("1")
+    if state.dim:
+        params.append("2")
+    if state.italic:
+        params.append("3")
+    if state.underline:
+        params.append("4")
+    if state.reverse:
+        params.append("7")
+    if state.fg:
+        params.append(state.fg)
+    if state.bg:
+        params.append(state.bg)
+    return params
+
+
+@functools.lru_cache(maxsize=4096)
+def sgr_transition(old: Optional[SgrState], new: SgrState) -> str:
+    """
+    Returns the shortest sequence that changes the attributes from
+    old to new, old being None when they are unknown.
+    """
+    if old == new:
+        return ""
+    from_reset = "\u001b[" + ";".join(["0"] + _sgr_params(new)) + "m"
+    if old is None:
+        return from_reset
+
+    params = []
+    if (old.bold and not new.bold) or (old.dim and not new.dim):
+        params.append("22")
+        old = old._replace(bold=False, dim=False)
+    if new.bold and not old.bold:
+        params.append("1")
+    if new.dim and not old.dim:
+        params.append("2")
+    for name, on, off in (("italic", "3", "23"), ("underline", "4", "24"), ("reverse", "7", "27")):
+        if getattr(old, name) != getattr(new, name):
+            params.append(on if getattr(new, name) else off)
+    if old.fg != new.fg:
+        params.append(new.fg or "39")
+    if old.bg != new.bg:
+        params.append(new.bg or "49")
+    incremental = "\u001b[" + ";".join(params) + "m"
+
+    return incremental if len(incremental) < len(from_reset) else from_reset
 
 
 def _ansi_string_len(string: str) -> int:
-    sl = 0
-    skip = False
-    for c in string:
-        if c == "\u001b":
-            skip = True
-        elif c in "mHJ" and skip:
-            skip = False
-        elif not skip:
-            sl += 2 if unicodedata.east_asian_width(c) == "W" else 1
-    return sl
+    return width.string_width(string)
 
 
 def begin() -> UiWriter:
     return UiWriter()
 
 
+_terminal_size = None
+
+
 def terminal_size() -> Tuple[int, int]:
-    output = subprocess.check_output(["stty", "size"]).decode()
-    return tuple(map(int, output.strip().split(" ")))
+    """
+    Returns the terminal (rows, columns), cached until invalidate_terminal_size()
+    """
+    global _terminal_size
+    if _terminal_size is None:
+        _terminal_size = _read_terminal_size()
+    return _terminal_size
+
+
+def invalidate_terminal_size():
+    global _terminal_size
+    _terminal_size = None
+
+
+def _read_terminal_size() -> Tuple[int, int]:
+    for stream in (sys.stdout, sys.stdin, sys.stderr):
+        try:
+            rows, columns = struct.unpack("hh", fcntl.ioctl(stream.fileno(), termios.TIOCGWINSZ, b"\0" * 4))
+            if rows > 0 and columns > 0:
+                return rows, columns
+        except Exception:
+            pass
+    size = shutil.get_terminal_size()
+    return size.lines, size.columns
 
 
 def cursor_on():
-    subprocess.check_output(["tput", "cnorm"])
+    begin().cursor_on().put()
 
 
 def cursor_off():
-    subprocess.check_output(["tput", "civis"])
+    begin().cursor_off().put()
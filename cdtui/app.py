@@ -1,21 +1,47 @@
+import asyncio
 import atexit
-import fcntl
+import heapq
+import itertools
 import logging
 import os
-import sys
-import termios
+import selectors
+import threading
 import time
-import tty
 
-from . import ansi, kbd
+from . import ansi, kbd, theme
+from .base import Rect
+from .layout import HBox, VBox
+from .listener import ListenerHandler
+from .screen import Screen
+from .stats import Stats, StatsHud
+from .term import TtyTerminal
 
 _logger = logging.getLogger(__name__)
 
+# Seconds to wait for the rest of an escape sequence
+_ESCAPE_TIMEOUT = 0.05
+
 class KeyHandler:
     def __init__(self, handler, valid_on_popup):
         self.handler = handler
         self.valid_on_popup = valid_on_popup
 
+def _noop():
+    pass
+
+class Timer:
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def __lt__(self, other):
+        return self.when < other.when
+
 class PauseTermSettingsHandler:
 
     def __init__(self, app):
@@ -28,58 +54,474 @@ class PauseTermSettingsHandler:
         self._app._init_term()
 
 class Application:
-    def __init__(self):
+    def __init__(self, terminal=None):
+        """
+        terminal is the backend to run on, the process terminal by
+        default, see term.Terminal.
+        """
+        self._terminal = terminal or TtyTerminal()
         self._components = []
+        self._layout = None
         self._focused_index = 0
         self._active_popup = None
         self._popup_closeable = True
+        # Open popups as (view, closeable), the active one last
+        self._popups = []
+        self._popup_surfaces = {}
         self._active = True
-        self._queue = set()
+        # A dict is used as an insertion ordered set
+        self._queue = {}
+        self._damage = []
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._wakeup_pending = False
+        self._loop_thread = None
+        self._key_decoder = kbd.KeyDecoder()
+        self._escape_timer = None
+        # Stops the main loop from waiting on input, set while it runs
+        self._unwatch_input = None
+        self._max_fps = 60
+        self._last_frame = 0
+        self._resize_pending = False
+        self._on_resize = ListenerHandler(self)
         self._key_handlers = {}
-        self._term_attrs = None
-
-    def add_component(self, component):
+        self._screen = None
+        self._timers = []
+        self._wakeup_fds = None
+        self._stats = Stats()
+        self._stats_exporter = None
+        self._stats_export_timer = None
+        self._hud = None
+
+    def add_component(self, component, size=None):
+        """
+        Adds a top level view, when a layout is set and a size given,
+        the view is also added to the layout with that size. Only HBox
+        and VBox layouts take a size, views go in a Grid with Grid.add().
+        """
+        if size is not None and self._layout is not None and not isinstance(self._layout, (HBox, VBox)):
+            raise TypeError(f"A size needs an HBox or VBox layout, not {type(self._layout).__name__}")
         component.set_application(self)
+        component.parent = None
         self._components.append(component)
+        if self._layout is not None and size is not None:
+            self._layout.add(component, size)
+
+    def set_layout(self, layout):
+        """
+        Sets the layout that gives the top level views their rects, its
+        views not yet added as components are added. The layout is solved
+        again only when the terminal size or the layout items change.
+        """
+        self._layout = layout
+        for view in layout.views():
+            if view not in self._components:
+                self.add_component(view)
+
+    def get_layout(self):
+        return self._layout
+
+    layout = property(get_layout, set_layout)
+
+    def _relayout(self):
+        if self._layout is not None:
+            height, width = self._terminal.size()
+            self._layout.apply(Rect(1, 1, width, height))
 
     def remove_component(self, component):
         self._components.remove(component)
         component.application = None
+        self._unqueue(component)
+        self.add_damage(component.rect)
         if self._focused_index >= len(self._components):
             self._cycle_focus()
 
+    def get_terminal(self):
+        return self._terminal
+
+    terminal = property(get_terminal)
+
     def _init_term(self):
-        self._term_attrs = termios.tcgetattr(sys.stdin)
-        tty.setraw(sys.stdin)
-        orig_fl = fcntl.fcntl(sys.stdin, fcntl.F_GETFL)
-        fcntl.fcntl(sys.stdin, fcntl.F_SETFL, orig_fl | os.O_NONBLOCK)
+        self._terminal.open()
+        height, width = self._terminal.size()
+        self._screen = Screen(width, height)
+        self._screen.invalidate()
+        ansi.set_output(self._screen)
+        self._add_popup_surfaces()
 
     def _restore_term(self):
-        ansi.begin().clrscr().cursor_on().put()
-        if self._term_attrs:
-            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, self._term_attrs)
+        ansi.set_output(None)
+        self._screen = None
+        self._popup_surfaces = {}
+        self._terminal.write(str(ansi.begin().reset().clrscr().cursor_on()))
+        self._terminal.flush()
+        self._terminal.close()
+
+    def set_synchronized_output(self, synchronized: bool):
+        self._terminal.synchronized = synchronized
+
+    def get_synchronized_output(self) -> bool:
+        return self._terminal.synchronized
+
+    synchronized_output = property(get_synchronized_output, set_synchronized_output)
+
+    def set_theme(self, colors):
+        """
+        Switches to a new colors dict, like base.COLORS, and repaints.
+        """
+        theme.set_theme(colors)
+        if self._screen:
+            self.refresh()
+
+    def get_theme(self):
+        return theme.get_theme()
+
+    theme = property(get_theme, set_theme)
+
+    @property
+    def stats(self) -> Stats:
+        """
+        Profiling data of the views painted, key dispatch and frames,
+        recorded only while profiling is enabled.
+        """
+        return self._stats
+
+    def set_profiling(self, profiling: bool):
+        self._stats.enabled = profiling
+
+    def get_profiling(self) -> bool:
+        return self._stats.enabled
+
+    profiling = property(get_profiling, set_profiling)
+
+    def set_stats_exporter(self, exporter, interval: float = 10):
+        """
+        Calls exporter(snapshot) with stats.snapshot() every interval seconds
+        while the main loop runs, ie stats.file_exporter(path).
+        Enables profiling, None stops exporting.
+        """
+        if self._stats_export_timer:
+            self._stats_export_timer.cancel()
+            self._stats_export_timer = None
+        self._stats_exporter = exporter
+        if exporter:
+            self._stats.enabled = True
+            self._stats_export_timer = self.call_later(interval, self._export_stats, interval)
+
+    def _export_stats(self, interval: float):
+        try:
+            self._stats_exporter(self._stats.snapshot())
+        except Exception:
+            _logger.exception("Exception exporting stats")
+        self._stats_export_timer = self.call_later(interval, self._export_stats, interval)
+
+    def set_stats_hud(self, visible: bool):
+        """
+        Shows or hides an overlay with the frame stats on the top right
+        corner, enables profiling to feed it.
+        """
+        if visible == (self._hud is not None):
+            return
+        if visible:
+            self._stats.enabled = True
+            self._hud = StatsHud(self._stats)
+            self._raise_hud()
+        else:
+            surface = self._popup_surfaces.pop(self._hud, None)
+            self._hud = None
+            if surface:
+                self._screen.remove_surface(surface)
+
+    def get_stats_hud(self) -> bool:
+        return self._hud is not None
+
+    stats_hud = property(get_stats_hud, set_stats_hud)
+
+    def toggle_stats_hud(self):
+        """
+        Shows the stats overlay if hidden and hides it otherwise, meant
+        to be bound to a key: app.set_key_handler(key, Application.toggle_stats_hud)
+        """
+        self.set_stats_hud(self._hud is None)
+
+    def _raise_hud(self):
+        """
+        Puts the stats overlay on a surface above all the others
+        """
+        hud = self._hud
+        if not hud or not self._screen:
+            return
+        surface = self._popup_surfaces.pop(hud, None)
+        if surface:
+            self._screen.remove_surface(surface)
+        width = self._terminal.size()[1]
+        hud.set_rect(Rect(max(width - hud.WIDTH + 1, 1), 1, hud.WIDTH, hud.HEIGHT))
+        self._add_popup_surface(hud)
+        self._paint_hud()
+
+    def _paint_hud(self):
+        if self._hud and self._screen:
+            self._screen.set_target(self._popup_surfaces.get(self._hud))
+            try:
+                self._hud.update()
+            finally:
+                self._screen.set_target(None)
 
     def pause_app(self) -> PauseTermSettingsHandler:
         return PauseTermSettingsHandler(self)
 
     def main_loop(self):
+        self._start_loop(threading.get_ident())
 
+        try:
+            with selectors.DefaultSelector() as selector:
+                input_fd = self._terminal.fileno()
+                selector.register(input_fd, selectors.EVENT_READ, self._on_input)
+                self._unwatch_input = lambda: selector.unregister(input_fd)
+                selector.register(self._wakeup_fds[0], selectors.EVENT_READ, self._on_wakeup)
+
+                while self._active:
+                    self._run_frame()
+                    if not self._active:
+                        break
+                    for key, _ in selector.select(self._select_timeout()):
+                        key.data()
+        finally:
+            self._stop_loop()
+
+        self._on_finish()
+
+    async def main_loop_async(self):
+        """
+        Runs the application inside the running asyncio event loop,
+        so other tasks can feed models and views directly.
+        """
+        loop = asyncio.get_event_loop()
+        # Other tasks share the loop thread, so queue_update() always
+        # has to wake the application up.
+        self._start_loop(None)
+        finished = loop.create_future()
+        timer_handle = None
+
+        def step(handler):
+            nonlocal timer_handle
+            try:
+                handler()
+                self._run_frame()
+            except Exception:
+                _logger.exception("Exception on main loop")
+            if not self._active:
+                if not finished.done():
+                    finished.set_result(None)
+                return
+            if timer_handle:
+                timer_handle.cancel()
+            timeout = self._select_timeout()
+            timer_handle = loop.call_later(timeout, step, _noop) if timeout is not None else None
+
+        input_fd = self._terminal.fileno()
+        loop.add_reader(input_fd, step, self._on_input)
+        self._unwatch_input = lambda: loop.remove_reader(input_fd)
+        loop.add_reader(self._wakeup_fds[0], step, self._on_wakeup)
+        try:
+            step(_noop)
+            await finished
+        finally:
+            if timer_handle:
+                timer_handle.cancel()
+            loop.remove_reader(input_fd)
+            loop.remove_reader(self._wakeup_fds[0])
+            self._stop_loop()
+
+        self._on_finish()
+
+    def run_async(self):
+        """
+        Runs main_loop_async() on a new asyncio event loop.
+        """
+        asyncio.run(self.main_loop_async())
+
+    def _start_loop(self, loop_thread):
+        self._active = True
         self._init_term()
 
         atexit.register(self._restore_term)
 
         self.refresh()
 
-        while self._active:
+        self._loop_thread = loop_thread
+        self._wakeup_fds = os.pipe()
+        for fd in self._wakeup_fds:
+            os.set_blocking(fd, False)
+
+        self._terminal.watch_resize(self._handle_resize)
+        self._terminal.watch_ready(self.wakeup)
+
+    def _stop_loop(self):
+        self._unwatch_input = None
+        self._terminal.unwatch_resize()
+        self._terminal.unwatch_ready()
+        with self._lock:
+            for fd in self._wakeup_fds:
+                os.close(fd)
+            self._wakeup_fds = None
+        self._loop_thread = None
+
+    def _handle_resize(self):
+        # May run from a signal handler, in between any two statements of
+        # the main thread, so it can't take the lock wakeup() uses.
+        self._resize_pending = True
+        try:
+            os.write(self._wakeup_fds[1], b"\0")
+        except Exception:
+            pass
+
+    @property
+    def on_resize(self) -> ListenerHandler:
+        """
+        Called with (width, height) when the terminal is resized, before
+        everything gets repainted. The place to set new view rects.
+        """
+        return self._on_resize
+
+    def _check_resize(self):
+        if not self._resize_pending:
+            return
+        self._resize_pending = False
+        self._terminal.invalidate_size()
+        height, width = self._terminal.size()
+        if self._screen:
+            self._screen.resize(width, height)
+        self._relayout()
+        self._on_resize(width, height)
+        for popup, _ in self._popups:
+            self._center_popup(popup)
+        self._add_popup_surfaces()
+        self.refresh()
+
+    def _run_frame(self):
+        self._check_resize()
+        self._run_timers()
+        self._run_callbacks()
+        self._relayout()
+        if self._frame_delay() <= 0:
             self.empty_queue()
+
+    def _frame_delay(self) -> float:
+        """
+        Seconds until the next frame can be painted.
+        """
+        if not self._max_fps:
+            return 0
+        return self._last_frame + 1 / self._max_fps - time.monotonic()
+
+    def set_max_fps(self, max_fps: float):
+        """
+        Sets how many times per second the screen can be painted at most,
+        all the updates queued in between are painted together.
+        None or 0 paints as soon as there is something queued.
+        """
+        self._max_fps = max_fps
+
+    def get_max_fps(self) -> float:
+        return self._max_fps
+
+    max_fps = property(get_max_fps, set_max_fps)
+
+    def wakeup(self):
+        """
+        Makes the main loop return from waiting for input.
+        Can be called from any thread.
+        """
+        with self._lock:
+            if self._wakeup_pending or not self._wakeup_fds:
+                return
+            self._wakeup_pending = True
+            try:
+                os.write(self._wakeup_fds[1], b"\0")
+            except (BlockingIOError, OSError):
+                pass
+
+    def _on_wakeup(self):
+        try:
+            while os.read(self._wakeup_fds[0], 512):
+                pass
+        except BlockingIOError:
+            pass
+        # Only once drained, a wakeup() from now on writes again
+        with self._lock:
+            self._wakeup_pending = False
+
+    def _on_input(self):
+        try:
             self._check_keyboard()
-            time.sleep(0.01)
+        except EOFError:
+            # Nothing will ever come, the input would be always ready to
+            # read, the application goes on without it.
+            _logger.info("Terminal input closed")
+            self._unwatch_input()
 
-        self._on_finish()
+    def call_later(self, delay: float, callback, *args) -> Timer:
+        """
+        Runs callback(*args) on the main loop after delay seconds,
+        must be called from the main loop thread.
+        """
+        timer = Timer(time.monotonic() + delay, callback, args)
+        heapq.heappush(self._timers, timer)
+        return timer
+
+    def _run_timers(self):
+        now = time.monotonic()
+        while self._timers and self._timers[0].when <= now:
+            timer = heapq.heappop(self._timers)
+            if not timer.cancelled:
+                try:
+                    timer.callback(*timer.args)
+                except Exception:
+                    _logger.exception("Exception on timer")
+
+    def _select_timeout(self):
+        if self._callbacks or self._resize_pending:
+            return 0
+        timeout = None
+        if self._queue or (self._damage and self._can_repair_damage()):
+            timeout = max(0, self._frame_delay())
+        elif self._screen and self._screen.dirty and not self._terminal.busy:
+            # While busy, the terminal wakes the loop up once ready
+            timeout = max(0, self._frame_delay())
+        while self._timers and self._timers[0].cancelled:
+            heapq.heappop(self._timers)
+        if self._timers:
+            timer_timeout = max(0, self._timers[0].when - time.monotonic())
+            timeout = timer_timeout if timeout is None else min(timeout, timer_timeout)
+        return timeout
+
+    @property
+    def idle(self) -> bool:
+        """
+        Tells if everything queued has been painted and sent to the
+        terminal, and no keystroke is halfway read.
+        """
+        with self._lock:
+            busy = self._queue or self._damage or self._callbacks
+        return not (
+            busy
+            or self._resize_pending
+            or self._escape_timer
+            or (self._screen and self._screen.dirty)
+            or self._terminal.busy
+        )
 
     def refresh(self):
+        self._relayout()
+        if self._can_repair_damage():
+            with self._lock:
+                self._damage = []
+        if self._screen:
+            self._screen.invalidate()
         ansi.begin().clrscr().cursor_off().put()
         self._update_view()
+        self._flush()
 
     def _on_finish(self):
         """
@@ -87,24 +529,164 @@ class Application:
         """
         pass
 
+    def _run_callbacks(self):
+        with self._lock:
+            callbacks = self._callbacks
+            self._callbacks = []
+        for callback, args in callbacks:
+            try:
+                callback(*args)
+            except Exception:
+                _logger.exception("Exception on callback")
+
     def empty_queue(self):
-        queue = self._queue
-        self._queue = set()
+        start = time.perf_counter()
+        self._run_callbacks()
+        with self._lock:
+            queue = self._queue
+            self._queue = {}
+        if self._can_repair_damage():
+            self._repair_damage(queue)
+        if queue:
+            self._last_frame = time.monotonic()
         try:
-            for view in queue:
-                if self._active_popup:
-                    if self._is_in_popup(view):
-                        view.update()
-                else:
-                    view.update()
+            for view in self._paint_order(queue):
+                # Without a screen to compose popups on, only the active one is painted
+                if self._screen or not self._active_popup or self._is_in_popup(view):
+                    self._paint(view)
+            if queue:
+                self._paint_hud()
         except Exception:
-            _logger.exception()
+            _logger.exception("Exception updating views")
+        output = self._flush()
+        if queue and self._stats.enabled:
+            self._stats.record_frame(time.perf_counter() - start, len(output.encode()))
+
+    def _flush(self) -> str:
+        """
+        Sends to the terminal the cells changed since the last flush,
+        as a single write, and returns them.
+        While the terminal is busy nothing is sent, the changes of the
+        frames in between go together in the first frame once it's ready.
+        """
+        if not self._screen or self._terminal.busy:
+            return ""
+        output = self._screen.render()
+        self._terminal.write(output)
+        self._terminal.flush()
+        return output
+
+    def _paint(self, view):
+        """
+        Paints a view on the layer of the popup it belongs to, or on
+        the base layer.
+        """
+        if self._screen:
+            self._screen.set_target(self._popup_surfaces.get(view.get_root()))
+        try:
+            if self._stats.enabled:
+                self._profile_update(view)
+            else:
+                view.update()
+        finally:
+            if self._screen:
+                self._screen.set_target(None)
+
+    def _profile_update(self, view):
+        # Containers paint their children, their time and output go along
+        written = self._screen.written if self._screen else 0
+        start = time.perf_counter()
+        view.update()
+        elapsed = time.perf_counter() - start
+        self._stats.record_view(view, elapsed, (self._screen.written - written) if self._screen else 0)
+
+    def _can_repair_damage(self) -> bool:
+        # Components can be painted under popups only with a screen
+        return self._screen is not None or not self._active_popup
+
+    def add_damage(self, rect):
+        """
+        Marks a screen area to be painted again by the views under it.
+        Can be called from any thread.
+        """
+        if rect.is_empty():
+            return
+        with self._lock:
+            self._damage.append(rect.frozen())
+        if threading.get_ident() != self._loop_thread:
+            self.wakeup()
+
+    def _repair_damage(self, queue):
+        """
+        Clears the damaged areas and adds the components that intersect
+        them to the queue.
+        """
+        with self._lock:
+            damage = self._damage
+            self._damage = []
+        if not damage:
+            return
+        buff = ansi.begin().reset()
+        for rect in damage:
+            for y in range(rect.y, rect.y + rect.height):
+                buff.gotoxy(rect.x, y).writefill("", rect.width)
+        buff.put()
+        for component in self._components:
+            if component.visible and any(component.rect.intersects(rect) for rect in damage):
+                queue[component] = None
+
+    def _paint_order(self, queue):
+        """
+        Returns the queued views that are not painted along with a
+        queued container, bottom most first.
+        """
+        z_order = {component: i for i, component in enumerate(self._components)}
+        for i, (popup, _) in enumerate(self._popups):
+            z_order[popup] = len(self._components) + i
+        views = []
+        for view in queue:
+            if view.application is not self or not view.visible:
+                # Removed, hidden or in a closed popup since it was queued
+                continue
+            parent = view.parent
+            while parent and parent not in queue:
+                parent = parent.parent
+            if not parent:
+                views.append(view)
+        return sorted(views, key=lambda v: (z_order.get(v.get_root(), -1), v.get_depth()))
 
     def _is_in_popup(self, view):
-        return self._active_popup and (self._active_popup == view or self._active_popup.contains(view))
+        return self._active_popup and (self._active_popup is view or view.is_descendant_of(self._active_popup))
+
+    def _unqueue(self, view):
+        """
+        Drops a view being detached, and the views inside it, from the queue
+        """
+        with self._lock:
+            for queued in [v for v in self._queue if v is view or v.is_descendant_of(view)]:
+                del self._queue[queued]
 
     def queue_update(self, view):
-        self._queue.add(view)
+        """
+        Schedules the view to be painted on the next frame, views queued
+        several times before that are painted once.
+        Can be called from any thread.
+        """
+        with self._lock:
+            self._queue[view] = None
+        if threading.get_ident() != self._loop_thread:
+            self.wakeup()
+
+    def call_soon_threadsafe(self, callback, *args):
+        """
+        Runs callback(*args) on the main loop thread before the next frame.
+        This is the way for worker threads to change models and views, ie:
+        app.call_soon_threadsafe(model.set_items, items)
+        """
+        with self._lock:
+            self._callbacks.append((callback, args))
+        if threading.get_ident() != self._loop_thread:
+            self.wakeup()
 
     def set_key_handler(self, keystroke, handler, valid_on_popup=True):
         self._key_handlers[keystroke] = KeyHandler(handler, valid_on_popup)
@@ -112,26 +694,75 @@ class Application:
     def unset_key_handler(self, keystroke):
         self._key_handlers.pop(keystroke)
 
-    def _check_keyboard(self):
-        read = sys.stdin.read(3)
-
-        if len(read) > 0:
-            keystroke = kbd.keystroke_from_str(read)
+    def _check_keyboard(self) -> bool:
+        """
+        Reads all the available input and dispatches the keystrokes in it.
+        """
+        data = self._terminal.read()
+        if not data:
+            return False
+
+        if self._escape_timer:
+            self._escape_timer.cancel()
+            self._escape_timer = None
+
+        self._dispatch_keys(self._key_decoder.feed(data))
+
+        if self._key_decoder.pending:
+            # Only a lone ESC or a sequence split by a slow link, wait a bit
+            # for the rest before taking it as it is.
+            self._escape_timer = self.call_later(_ESCAPE_TIMEOUT, self._flush_keyboard)
+        return True
+
+    def _flush_keyboard(self):
+        self._escape_timer = None
+        self._dispatch_keys(self._key_decoder.flush())
+
+    def _dispatch_keys(self, keystrokes):
+        for keystroke, group in itertools.groupby(keystrokes):
+            count = sum(1 for _ in group)
+            if not self._active:
+                return
+            if self._stats.enabled:
+                start = time.perf_counter()
+                self._dispatch_repeated_key(keystroke, count)
+                self._stats.record_key(time.perf_counter() - start)
+            else:
+                self._dispatch_repeated_key(keystroke, count)
+
+    def _dispatch_repeated_key(self, keystroke, count):
+        if count > 1 and keystroke in kbd.NAVIGATION_KEYS and keystroke not in self._key_handlers:
+            # A held down key, move all the way in one go
+            self._send_key_event(keystroke, count)
+            return
+        for _ in range(count):
+            if not self._active:
+                return
+            self._dispatch_key(keystroke)
+
+    def _dispatch_key(self, keystroke):
+        if keystroke == kbd.KEY_ESC:
+            self._handle_exit()
+        elif keystroke == kbd.KEY_TAB:
+            self._cycle_focus()
+        elif keystroke == kbd.KEY_SHIFT_TAB:
+            self._cycle_focus_back()
+        else:
+            handler = self._key_handlers.get(keystroke)
+            _logger.debug(f"Key handler for keystroke {keystroke}: {handler}")
 
-            if keystroke == kbd.KEY_ESC:
-                self._handle_exit()
-            elif keystroke == kbd.KEY_TAB:
-                self._cycle_focus()
-            elif keystroke == kbd.KEY_SHIFT_TAB:
-                self._cycle_focus_back()
+            if handler and (handler.valid_on_popup or not self._active_popup):
+                handler.handler(self)
             else:
-                handler = self._key_handlers.get(keystroke)
-                _logger.debug(f"Key handler for keystroke {keystroke}: {handler}")
+                self._send_key_event(keystroke)
 
-                if handler and (handler.valid_on_popup or not self._active_popup):
-                    handler.handler(self)
-                else:
-                    self._send_key_event(keystroke)
+    def stop(self):
+        """
+        Makes the main loop end after the current frame
+        """
+        self._active = False
+        if threading.get_ident() != self._loop_thread:
+            self.wakeup()
 
     def _handle_exit(self):
         if self._active_popup:
@@ -178,33 +809,77 @@ class Application:
         self._focused_index = self._components.index(view)
         view.set_focused(True)
 
-    def _send_key_event(self, input_key):
+    def _send_key_event(self, input_key, count=1):
         if self._active_popup:
-            self._active_popup.on_key_press(input_key)
+            view = self._active_popup
+        elif self._components:
+            view = self._components[self._focused_index]
+        else:
+            return
+        if count == 1:
+            view.on_key_press(input_key)
         else:
-            if self._components:
-                self._components[self._focused_index].on_key_press(input_key)
+            view.on_key_repeat(input_key, count)
 
     def _update_view(self):
-        if self._active_popup:
-            self._active_popup.update()
+        if self._screen:
+            for component in self._components:
+                self._paint(component)
+            for popup, _ in self._popups:
+                self._paint(popup)
+            self._paint_hud()
+        elif self._active_popup:
+            self._paint(self._active_popup)
         else:
             for component in self._components:
-                component.update()
+                self._paint(component)
+
+    def _add_popup_surfaces(self):
+        """
+        Gives every open popup a surface on a new screen
+        """
+        self._popup_surfaces = {}
+        for popup, _ in self._popups:
+            self._add_popup_surface(popup)
+        self._raise_hud()
+
+    def _add_popup_surface(self, view):
+        if self._screen:
+            rect = view.rect
+            self._popup_surfaces[view] = self._screen.push_surface(rect.x - 1, rect.y - 1, rect.width, rect.height)
+
+    def _center_popup(self, view):
+        max_height, max_width = self._terminal.size()
+        rect = view.rect
+        view.set_rect(
+            Rect(int((max_width - rect.width) / 2), int((max_height - rect.height) / 2), rect.width, rect.height)
+        )
 
     def open_popup(self, view, closeable=True):
-        max_height, max_width = ansi.terminal_size()
+        """
+        Shows a view centered on top of everything else, popups can be
+        stacked and receive the keyboard input until closed.
+        """
+        self._center_popup(view)
         view.set_application(self)
-        view._rect.x = int((max_width - view._rect.width) / 2)
-        view._rect.y = int((max_height - view._rect.height) / 2)
+        view.parent = None
+        self._popups.append((view, closeable))
         self._active_popup = view
-        self._active_popup.update()
         self._popup_closeable = closeable
+        self._add_popup_surface(view)
+        self._paint(view)
+        self._raise_hud()
 
     def close_popup(self):
         if self._active_popup:
             if self._popup_closeable:
-                self._active_popup.set_application(None)
-                self._active_popup = None
-                ansi.begin().clrscr().put()
-                self._update_view()
+                popup, _ = self._popups.pop()
+                popup.set_application(None)
+                self._unqueue(popup)
+                surface = self._popup_surfaces.pop(popup, None)
+                if surface:
+                    # Uncovers what was under it, no repaint needed
+                    self._screen.remove_surface(surface)
+                else:
+                    self.add_damage(popup.rect)
+                self._active_popup, self._popup_closeable = self._popups[-1] if self._popups else (None, True)
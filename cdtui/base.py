@@ -1,5 +1,3 @@
-from dataclasses import dataclass
-
 COLORS = {
     "titledview.bg": "\u001b[48;5;241m",
     "titledview.fg": "\u001b[38;5;0m",
@@ -20,13 +18,27 @@ COLORS = {
     "filechooser.footer.bg": "\u001b[48;5;236m",
     "filechooser.footer.fg": "\u001b[38;5;255m",
     "filechooser.bg": "\u001b[48;5;0m",
+    "statshud.bg": "\u001b[48;5;17m",
+    "statshud.fg": "\u001b[38;5;226m",
 }
 
 
-@dataclass
 class Point:
-    x: int = 0
-    y: int = 0
+    __slots__ = ("x", "y")
+
+    def __init__(self, x: int = 0, y: int = 0):
+        self.x = x
+        self.y = y
+
+    def __eq__(self, other):
+        if not isinstance(other, Point):
+            return NotImplemented
+        return self.x == other.x and self.y == other.y
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Point(x={self.x}, y={self.y})"
 
     def __str__(self) -> str:
         return f"Point:{self.x},{self.y}"
@@ -34,11 +46,26 @@ class Point:
     def copy(self):
         return Point(self.x, self.y)
 
+    def frozen(self) -> "FrozenPoint":
+        return FrozenPoint(self.x, self.y)
+
 
-@dataclass
 class Dimension:
-    width: int = 0
-    height: int = 0
+    __slots__ = ("width", "height")
+
+    def __init__(self, width: int = 0, height: int = 0):
+        self.width = width
+        self.height = height
+
+    def __eq__(self, other):
+        if not isinstance(other, Dimension):
+            return NotImplemented
+        return self.width == other.width and self.height == other.height
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Dimension(width={self.width}, height={self.height})"
 
     def __str__(self):
         return f"Dimension:{self.width},{self.height}"
@@ -46,24 +73,158 @@ class Dimension:
     def copy(self):
         return Dimension(self.width, self.height)
 
+    def frozen(self) -> "FrozenDimension":
+        return FrozenDimension(self.width, self.height)
+
 
-@dataclass
 class Rect:
-    x: int = 0
-    y: int = 0
-    width: int = 0
-    height: int = 0
+    __slots__ = ("x", "y", "width", "height", "_location", "_dimension")
+
+    def __init__(self, x: int = 0, y: int = 0, width: int = 0, height: int = 0):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self._location = None
+        self._dimension = None
+
+    def __eq__(self, other):
+        if not isinstance(other, Rect):
+            return NotImplemented
+        return (
+            self.x == other.x and self.y == other.y and self.width == other.width and self.height == other.height
+        )
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Rect(x={self.x}, y={self.y}, width={self.width}, height={self.height})"
 
     def __str__(self):
         return f"Rect:{self.x},{self.y},{self.width},{self.height}"
 
     @property
-    def location(self):
-        return Point(self.x, self.y)
+    def location(self) -> "FrozenPoint":
+        # Cached until the rect moves, frozen so it can be shared
+        location = self._location
+        if location is None or location.x != self.x or location.y != self.y:
+            location = self._location = FrozenPoint(self.x, self.y)
+        return location
 
     @property
-    def dimension(self):
-        return Dimension(self.width, self.height)
+    def dimension(self) -> "FrozenDimension":
+        dimension = self._dimension
+        if dimension is None or dimension.width != self.width or dimension.height != self.height:
+            dimension = self._dimension = FrozenDimension(self.width, self.height)
+        return dimension
 
     def copy(self):
         return Rect(self.x, self.y, self.width, self.height)
+
+    def frozen(self) -> "FrozenRect":
+        return FrozenRect(self.x, self.y, self.width, self.height)
+
+    def matches(self, x: int, y: int, width: int, height: int) -> bool:
+        """
+        Compares against coordinates without building another rect
+        """
+        return self.x == x and self.y == y and self.width == width and self.height == height
+
+    def is_empty(self) -> bool:
+        return self.width <= 0 or self.height <= 0
+
+    def intersects(self, other: "Rect") -> bool:
+        return (
+            self.x < other.x + other.width
+            and other.x < self.x + self.width
+            and self.y < other.y + other.height
+            and other.y < self.y + self.height
+            and not self.is_empty()
+            and not other.is_empty()
+        )
+
+    def intersection(self, other: "Rect") -> "Rect":
+        x = max(self.x, other.x)
+        y = max(self.y, other.y)
+        width = min(self.x + self.width, other.x + other.width) - x
+        height = min(self.y + self.height, other.y + other.height) - y
+        if width <= 0 or height <= 0:
+            return Rect(x, y, 0, 0)
+        return Rect(x, y, width, height)
+
+    def union(self, other: "Rect") -> "Rect":
+        """
+        Returns the smallest rect containing both
+        """
+        if self.is_empty():
+            return other.copy()
+        if other.is_empty():
+            return self.copy()
+        x = min(self.x, other.x)
+        y = min(self.y, other.y)
+        width = max(self.x + self.width, other.x + other.width) - x
+        height = max(self.y + self.height, other.y + other.height) - y
+        return Rect(x, y, width, height)
+
+
+def _frozen_setattr(self, name, value):
+    raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+
+class FrozenPoint(Point):
+    __slots__ = ()
+    __setattr__ = _frozen_setattr
+
+    def __init__(self, x: int = 0, y: int = 0):
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+
+class FrozenDimension(Dimension):
+    __slots__ = ()
+    __setattr__ = _frozen_setattr
+
+    def __init__(self, width: int = 0, height: int = 0):
+        object.__setattr__(self, "width", width)
+        object.__setattr__(self, "height", height)
+
+    def __hash__(self):
+        return hash((self.width, self.height))
+
+
+class FrozenRect(Rect):
+    """
+    Immutable and hashable rect
+    """
+
+    __slots__ = ()
+    __setattr__ = _frozen_setattr
+
+    def __init__(self, x: int = 0, y: int = 0, width: int = 0, height: int = 0):
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+        object.__setattr__(self, "width", width)
+        object.__setattr__(self, "height", height)
+        object.__setattr__(self, "_location", None)
+        object.__setattr__(self, "_dimension", None)
+
+    def __hash__(self):
+        return hash((self.x, self.y, self.width, self.height))
+
+    @property
+    def location(self) -> FrozenPoint:
+        if self._location is None:
+            object.__setattr__(self, "_location", FrozenPoint(self.x, self.y))
+        return self._location
+
+    @property
+    def dimension(self) -> FrozenDimension:
+        if self._dimension is None:
+            object.__setattr__(self, "_dimension", FrozenDimension(self.width, self.height))
+        return self._dimension
+
+    def frozen(self) -> "FrozenRect":
+        return self
@@ -60,9 +60,19 @@ class InputDialog(View):
         super().__init__()
         self._title = title
         self._input = Input(disallowed_chars=disallowed_chars)
+        self._input.parent = self
         self._input.on_enter.add(self._on_enter)
         self._on_confirm = on_confirm
-        self._rect = Rect(0, 0, 40, 5)
+        self.set_rect(Rect(0, 0, 40, 5))
+
+    def set_rect(self, rect):
+        super().set_rect(rect)
+        if not self._input.rect.matches(rect.x, rect.y + 2, rect.width, 1):
+            self._input.set_rect(Rect(rect.x, rect.y + 2, rect.width, 1))
+
+    def set_application(self, application):
+        super().set_application(application)
+        self._input.set_application(application)
 
     def _on_enter(self, field, input_text):
         self._on_confirm(input_text)
@@ -77,9 +87,6 @@ class InputDialog(View):
             .writefill("Enter: Accept, Esc: Cancel", self._rect.width)
             .reset()
         ).put()
-        r = self._rect.copy()
-        r.y += 2
-        self._input.rect = r
         self._input.update()
 
     def on_key_press(self, input_key):
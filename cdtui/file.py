@@ -3,6 +3,7 @@ from .list import ListView, ListModel
 import os
 from . import ansi
 from .listener import ListenerHandler
+from .base import Rect
 
 
 class FileItem:
@@ -66,6 +67,9 @@ class FileListModel(ListModel):
     def get_item(self, index):
         return self._items[index]
 
+    def get_items(self, start, stop):
+        return self._items[start:stop]
+
 
 class FileListView(ListView):
     def __init__(self, model=None):
@@ -88,8 +92,19 @@ class FileChooser(View):
         super().__init__(rect)
         self._file_list_model = FileListModel(path or os.getcwd(), file_filter)
         self._file_list_view = FileListView(model=self._file_list_model)
+        self._file_list_view.parent = self
         self._file_list_view.on_select.add(self._on_item_selected)
         self._on_file_selected = ListenerHandler(self)
+        self._update_list_rect()
+
+    def set_rect(self, rect):
+        super().set_rect(rect)
+        self._update_list_rect()
+
+    def _update_list_rect(self):
+        rect = self._rect
+        if not self._file_list_view.rect.matches(rect.x, rect.y + 2, rect.width, rect.height - 3):
+            self._file_list_view.set_rect(Rect(rect.x, rect.y + 2, rect.width, rect.height - 3))
 
     def set_application(self, application):
         super().set_application(application)
@@ -103,13 +118,16 @@ class FileChooser(View):
             self._file_list_model.go_into(item)
             self._selected_index = -1
             self._current_index = 0
-            self.update()
+            self.queue_update()
         elif not item.isdir:
             self._notify_file_selected(item.path)
 
     def on_key_press(self, input_key):
         self._file_list_view.on_key_press(input_key)
 
+    def on_key_repeat(self, input_key, count):
+        self._file_list_view.on_key_repeat(input_key, count)
+
     def _notify_file_selected(self, path):
         self._on_file_selected(path)
 
@@ -118,10 +136,6 @@ class FileChooser(View):
         return self._on_file_selected
 
     def update(self):
-        rect = self._rect.copy()
-        rect.y += 2
-        rect.height -= 3
-        self._file_list_view.set_rect(rect)
         self._file_list_view.update()
 
         (
@@ -0,0 +1,455 @@
+import os
+import re
+import select
+from typing import List, Optional, Tuple
+
+from . import ansi, kbd
+from .listener import ListenerHandler
+from .term import Terminal
+from .width import char_width
+
+# Parsed separately from screen.Screen so it can check Screen's output:
+# CSI sequences, other escapes, single control chars and runs of text.
+_SEQUENCE = re.compile(r"\x1b\[([0-?]*)[ -/]*([@-~])|\x1b[ -/]*[0-~]?|[\x00-\x1f\x7f]|[^\x00-\x1f\x7f\x1b]+")
+
+_TAB_SIZE = 8
+
+# Seconds between checks for the application to be idle
+_POLL_INTERVAL = 0.005
+
+# A cell is a (char, attributes) tuple, the right half of a wide char is
+# stored as an empty char.
+Cell = Tuple[str, ansi.SgrState]
+
+_BLANK = (" ", ansi.DEFAULT_SGR)
+
+
+class VirtualScreen:
+    """
+    In memory emulation of a VT100/xterm like terminal, keeps the cells
+    drawn by the output written to it so they can be inspected.
+    Lines don't wrap, text past the right margin is dropped.
+    """
+
+    def __init__(self, width: int, height: int):
+        self._width = width
+        self._height = height
+        self._rows = [[_BLANK] * width for _ in range(height)]
+        self._x = 0
+        self._y = 0
+        self._saved = (0, 0, ansi.DEFAULT_SGR)
+        self._attr = ansi.DEFAULT_SGR
+        # Scroll region as 0 based (top, bottom)
+        self._region = None
+        self.cursor_visible = True
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @property
+    def height(self) -> int:
+        return self._height
+
+    def resize(self, width: int, height: int):
+        """
+        Sets a new size, keeping the content that still fits
+        """
+        rows = [row[:width] + [_BLANK] * (width - len(row)) for row in self._rows[:height]]
+        self._rows = rows + [[_BLANK] * width for _ in range(height - len(rows))]
+        self._width = width
+        self._height = height
+        self._x = min(self._x, width - 1)
+        self._y = min(self._y, height - 1)
+        self._region = None
+
+    @property
+    def cursor(self) -> Tuple[int, int]:
+        """
+        Returns the 0 based cursor position as (x, y)
+        """
+        return self._x, self._y
+
+    def cell(self, x: int, y: int) -> Cell:
+        """
+        Returns the cell at 0 based position x, y
+        """
+        return self._rows[y][x]
+
+    def line(self, y: int) -> str:
+        """
+        Returns the text of row y, without attributes.
+        """
+        return "".join(c for c, _ in self._rows[y])
+
+    def lines(self) -> List[str]:
+        return [self.line(y) for y in range(self._height)]
+
+    def text(self) -> str:
+        """
+        Returns the screen text, trailing spaces removed
+        """
+        return "\n".join(line.rstrip() for line in self.lines())
+
+    def find(self, text: str) -> Optional[Tuple[int, int]]:
+        """
+        Returns the 0 based (x, y) position where text is shown, or None.
+        """
+        for y in range(self._height):
+            x = self.line(y).find(text)
+            if x >= 0:
+                return x, y
+        return None
+
+    def write(self, data: str):
+        for match in _SEQUENCE.finditer(data):
+            token = match.group(0)
+            if match.group(2):
+                self._csi(match.group(1), match.group(2))
+            elif token[0] == "\u001b":
+                self._escape(token)
+            elif len(token) == 1 and (token < " " or token == "\x7f"):
+                self._execute(token)
+            else:
+                self._print(token)
+
+    def _blank(self) -> Cell:
+        # Erased cells take the current background, as xterm does
+        return (" ", ansi.DEFAULT_SGR._replace(bg=self._attr.bg)) if self._attr.bg else _BLANK
+
+    def _print(self, text: str):
+        if self._y >= self._height:
+            return
+        row = self._rows[self._y]
+        width = self._width
+        x = self._x
+        for char in text:
+            cells = char_width(char)
+            if cells == 0:
+                # Combining chars go along with the previous one
+                prev = x - 1
+                if prev > 0 and row[prev][0] == "":
+                    prev -= 1
+                if 0 <= prev < width:
+                    row[prev] = (row[prev][0] + char, row[prev][1])
+                continue
+            if x + cells > width:
+                x = width
+                break
+            self._clear_wide(row, x)
+            self._clear_wide(row, x + cells - 1)
+            row[x] = (char, self._attr)
+            if cells == 2:
+                row[x + 1] = ("", self._attr)
+            x += cells
+        self._x = x
+
+    def _clear_wide(self, row: List[Cell], x: int):
+        # Overwriting half of a wide char blanks the other half
+        if row[x][0] == "" and x > 0:
+            row[x - 1] = (" ", row[x - 1][1])
+        elif x + 1 < self._width and row[x + 1][0] == "":
+            row[x + 1] = (" ", row[x + 1][1])
+
+    def _execute(self, char: str):
+        if char == "\r":
+            self._x = 0
+        elif char == "\n":
+            top, bottom = self._region or (0, self._height - 1)
+            if self._y == bottom:
+                self._scroll(top, bottom, 1)
+            else:
+                self._y = min(self._y + 1, self._height - 1)
+        elif char == "\b":
+            self._x = max(min(self._x, self._width - 1) - 1, 0)
+        elif char == "\t":
+            self._x = max(min((self._x // _TAB_SIZE + 1) * _TAB_SIZE, self._width - 1), self._x)
+
+    def _escape(self, token: str):
+        if token == "\u001b7":
+            self._saved = (self._x, self._y, self._attr)
+        elif token == "\u001b8":
+            self._x, self._y, self._attr = self._saved
+
+    def _csi(self, params: str, final: str):
+        if params.startswith("?"):
+            if params == "?25" and final in "hl":
+                self.cursor_visible = final == "h"
+            return
+        if final == "m":
+            self._attr = ansi.sgr_apply(self._attr, params)
+            return
+        values = [int(value) if value.isdigit() else 0 for value in params.split(";")]
+        count = max(values[0], 1)
+        if final in "Hf":
+            self._y = min(count, self._height) - 1
+            self._x = min(max(values[1], 1), self._width) - 1 if len(values) > 1 else 0
+        elif final == "r":
+            top = max(values[0], 1) - 1
+            bottom = min(values[1], self._height) - 1 if len(values) > 1 and values[1] else self._height - 1
+            self._region = (top, bottom) if top < bottom else None
+            self._x = 0
+            self._y = 0
+        elif final == "A":
+            self._y = max(self._y - count, 0)
+        elif final == "B":
+            self._y = min(self._y + count, self._height - 1)
+        elif final == "C":
+            self._x = min(self._x + count, self._width - 1)
+        elif final == "D":
+            self._x = max(self._x - count, 0)
+        elif final == "G":
+            self._x = min(count, self._width) - 1
+        elif final == "d":
+            self._y = min(count, self._height) - 1
+        elif final in "ST":
+            top, bottom = self._region or (0, self._height - 1)
+            self._scroll(top, bottom, count if final == "S" else -count)
+        elif final == "K":
+            self._erase_line(self._y, values[0])
+        elif final == "J":
+            if values[0] == 2:
+                rows = range(self._height)
+            else:
+                self._erase_line(self._y, values[0])
+                rows = range(self._y + 1, self._height) if values[0] == 0 else range(self._y)
+            for y in rows:
+                self._rows[y] = [self._blank()] * self._width
+
+    def _scroll(self, top: int, bottom: int, lines: int):
+        rows = self._rows[top : bottom + 1]
+        lines = max(min(lines, len(rows)), -len(rows))
+        new_rows = [[self._blank()] * self._width for _ in range(abs(lines))]
+        self._rows[top : bottom + 1] = rows[lines:] + new_rows if lines > 0 else new_rows + rows[: len(rows) + lines]
+
+    def _erase_line(self, y: int, mode: int):
+        if y >= self._height:
+            return
+        row = self._rows[y]
+        x = min(self._x, self._width)
+        if mode == 0:
+            row[x:] = [self._blank()] * (self._width - x)
+        elif mode == 1:
+            row[: x + 1] = [self._blank()] * min(x + 1, self._width)
+        else:
+            row[:] = [self._blank()] * self._width
+
+
+class HeadlessTerminal(Terminal):
+    """
+    Terminal backend that runs without a tty, output goes to a
+    VirtualScreen and input is whatever is sent with send().
+    """
+
+    def __init__(self, width: int = 80, height: int = 24, synchronized: bool = False):
+        self._screen = VirtualScreen(width, height)
+        self._synchronized = synchronized
+        self._input_fds = list(os.pipe())
+        os.set_blocking(self._input_fds[0], False)
+        self._frame = []
+        self._resize_callback = None
+        self._ready_callback = None
+        self._busy = False
+        self._on_flush = ListenerHandler(self)
+        self.bytes_written = 0
+        self.frames = 0
+
+    def __del__(self):
+        for fd in getattr(self, "_input_fds", ()):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+    @property
+    def screen(self) -> VirtualScreen:
+        return self._screen
+
+    @property
+    def on_flush(self) -> ListenerHandler:
+        """
+        Called with the output of every frame once it reached the screen
+        """
+        return self._on_flush
+
+    def send(self, *keys):
+        """
+        Types keys, each one a keystroke from kbd, a string or raw bytes.
+        """
+        for key in keys:
+            if isinstance(key, int):
+                key = kbd.key_sequence(key)
+            if isinstance(key, str):
+                key = key.encode()
+            os.write(self._input_fds[1], key)
+
+    def close_input(self):
+        """
+        Closes the input, like a tty hung up or a pipe at its end would.
+        """
+        if self._input_fds[1] is not None:
+            os.close(self._input_fds[1])
+            self._input_fds[1] = None
+
+    @property
+    def input_pending(self) -> bool:
+        """
+        Tells if there is input sent not yet read by the application,
+        always False once the input is closed.
+        """
+        if self._input_fds[1] is None:
+            return False
+        return bool(select.select([self._input_fds[0]], [], [], 0)[0])
+
+    def resize(self, width: int, height: int):
+        """
+        Changes the terminal size, like a window resize would.
+        """
+        self._screen.resize(width, height)
+        if self._resize_callback:
+            self._resize_callback()
+
+    def fileno(self) -> int:
+        return self._input_fds[0]
+
+    def size(self) -> Tuple[int, int]:
+        return self._screen.height, self._screen.width
+
+    def write(self, data: str):
+        if data:
+            self._frame.append(data)
+
+    def flush(self):
+        if not self._frame:
+            return
+        frame = "".join(self._frame)
+        self._frame = []
+        if self._synchronized:
+            frame = ansi.SYNC_BEGIN + frame + ansi.SYNC_END
+        self.bytes_written += len(frame.encode())
+        self.frames += 1
+        self._screen.write(frame)
+        self._on_flush(frame)
+
+    def watch_resize(self, callback):
+        self._resize_callback = callback
+
+    def unwatch_resize(self):
+        self._resize_callback = None
+
+    def set_busy(self, busy: bool):
+        """
+        Emulates a terminal that can't keep up with the output,
+        ie on a slow link.
+        """
+        self._busy = busy
+        if not busy and self._ready_callback:
+            self._ready_callback()
+
+    def get_busy(self) -> bool:
+        return self._busy
+
+    busy = property(get_busy, set_busy)
+
+    def watch_ready(self, callback):
+        self._ready_callback = callback
+
+    def unwatch_ready(self):
+        self._ready_callback = None
+
+    def set_synchronized(self, synchronized: bool):
+        self._synchronized = synchronized
+
+    def get_synchronized(self) -> bool:
+        return self._synchronized
+
+    synchronized = property(get_synchronized, set_synchronized)
+
+
+class KeyScript:
+    """
+    Types keys into a headless terminal while an application runs on it.
+    Steps run in order on the main loop, each one once the application
+    has painted everything the previous one caused, ie:
+
+        terminal = HeadlessTerminal(80, 24)
+        app = Application(terminal=terminal)
+        ...
+        KeyScript(terminal).keys(kbd.KEY_DOWN).call(check_screen).run(app)
+    """
+
+    def __init__(self, terminal: HeadlessTerminal):
+        self._terminal = terminal
+        self._steps = []
+        self._app = None
+        self._next_step = 0
+        self._stop_at_end = False
+        self._error = None
+
+    def keys(self, *keys) -> "KeyScript":
+        self._steps.append((self._terminal.send, keys))
+        return self
+
+    def call(self, callback, *args) -> "KeyScript":
+        """
+        Adds a step calling callback(*args), ie to check the screen
+        contents. Exceptions raised end the script and the application.
+        """
+        self._steps.append((callback, args))
+        return self
+
+    def resize(self, width: int, height: int) -> "KeyScript":
+        self._steps.append((self._terminal.resize, (width, height)))
+        return self
+
+    def wait(self, seconds: float) -> "KeyScript":
+        self._steps.append((None, (seconds,)))
+        return self
+
+    @property
+    def done(self) -> bool:
+        return self._next_step >= len(self._steps)
+
+    def start(self, app):
+        """
+        Starts running the steps once the application main loop runs
+        """
+        self._app = app
+        self._next_step = 0
+        self._error = None
+        app.call_soon_threadsafe(self._run_steps)
+
+    def run(self, app):
+        """
+        Runs the application main loop until the script is done,
+        then stops it. Exceptions raised by steps are raised again.
+        """
+        self._stop_at_end = True
+        try:
+            self.start(app)
+            app.main_loop()
+        finally:
+            self._stop_at_end = False
+        if self._error:
+            raise self._error
+
+    def _run_steps(self):
+        app = self._app
+        while not self._terminal.input_pending and app.idle:
+            if self.done:
+                if self._stop_at_end:
+                    app.stop()
+                return
+            callback, args = self._steps[self._next_step]
+            self._next_step += 1
+            if callback is None:
+                app.call_later(args[0], self._run_steps)
+                return
+            try:
+                callback(*args)
+            except Exception as e:
+                self._error = e
+                app.stop()
+                return
+        app.call_later(_POLL_INTERVAL, self._run_steps)
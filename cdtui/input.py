@@ -30,7 +30,7 @@ class Input(View):
             if self._cursor_x > 0:
                 self._buffer = self._buffer[0 : len(self._buffer) - 1]
                 self._cursor_x -= 1
-                self.update()
+                self.queue_update()
         elif input_key == kbd.KEY_ENTER:
             self._on_enter(str(self._buffer))
         elif input_key < 127:
@@ -38,7 +38,7 @@ class Input(View):
             if char not in self._disallowed_chars:
                 self._buffer += char
                 self._cursor_x += 1
-                self.update()
+                self.queue_update()
 
     def update(self):
         (ansi.begin().gotoxy(self._rect.x, self._rect.y).writefill(self._buffer, self._rect.width, "_")).put()
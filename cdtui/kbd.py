@@ -1,3 +1,6 @@
+import codecs
+from typing import List
+
 keystroke = lambda x: sum([i * (100 ** n) for n, i in enumerate(reversed(x))])
 keystroke_from_str = lambda x: keystroke(list(map(ord, x)))
 
@@ -10,7 +13,119 @@ KEY_PGDN = keystroke([27, 91, 54])
 KEY_HOME = keystroke([27, 91, 72])
 KEY_SHIFT_TAB = keystroke([27, 91, 90])
 
+# Keys whose consecutive presses can be handled as a single move
+NAVIGATION_KEYS = frozenset([KEY_UP, KEY_DOWN, KEY_RIGHT, KEY_LEFT, KEY_PGUP, KEY_PGDN])
+
 KEY_ESC = 27
 KEY_TAB = 9
 KEY_ENTER = 13
 KEY_BACKSPACE = 127
+
+# Escape sequences without the leading ESC
+_SEQUENCES = {
+    "[A": KEY_UP,
+    "[B": KEY_DOWN,
+    "[C": KEY_RIGHT,
+    "[D": KEY_LEFT,
+    "[5~": KEY_PGUP,
+    "[6~": KEY_PGDN,
+    "[H": KEY_HOME,
+    "[1~": KEY_HOME,
+    "[7~": KEY_HOME,
+    "[Z": KEY_SHIFT_TAB,
+    "OA": KEY_UP,
+    "OB": KEY_DOWN,
+    "OC": KEY_RIGHT,
+    "OD": KEY_LEFT,
+    "OH": KEY_HOME,
+}
+
+# The sequence sent for each key, the first one listed above
+_KEY_SEQUENCES = {}
+for _sequence, _key in _SEQUENCES.items():
+    _KEY_SEQUENCES.setdefault(_key, "\u001b" + _sequence)
+
+
+def key_sequence(key: int) -> str:
+    """
+    Returns the input a terminal sends for a keystroke, either one of the
+    known keys above or a single char.
+    """
+    sequence = _KEY_SEQUENCES.get(key)
+    return sequence if sequence is not None else chr(key)
+
+
+_GROUND = 0
+_ESCAPE = 1
+_CSI = 2
+_SS3 = 3
+
+
+class KeyDecoder:
+    """
+    Turns raw terminal input into keystrokes.
+    Input can be fed in chunks of any size, sequences split across
+    chunks are completed on the next feed().
+    """
+
+    def __init__(self, encoding: str = "utf-8"):
+        self._decoder = codecs.getincrementaldecoder(encoding)("replace")
+        self._state = _GROUND
+        self._sequence = ""
+
+    @property
+    def pending(self) -> bool:
+        """
+        Tells if there is an incomplete escape sequence waiting for more input.
+        """
+        return self._state != _GROUND
+
+    def feed(self, data: bytes) -> List[int]:
+        keys = []
+        for char in self._decoder.decode(data):
+            state = self._state
+            if state == _GROUND:
+                if char == "\u001b":
+                    self._state = _ESCAPE
+                else:
+                    keys.append(ord(char))
+            elif state == _ESCAPE:
+                if char == "[":
+                    self._state = _CSI
+                    self._sequence = char
+                elif char == "O":
+                    self._state = _SS3
+                    self._sequence = char
+                elif char == "\u001b":
+                    keys.append(KEY_ESC)
+                else:
+                    # Alt + key
+                    self._state = _GROUND
+                    keys.append(keystroke([27, ord(char)]))
+            elif state == _CSI:
+                self._sequence += char
+                if "@" <= char <= "~":
+                    self._end_sequence(keys)
+            else:
+                self._sequence += char
+                self._end_sequence(keys)
+        return keys
+
+    def flush(self) -> List[int]:
+        """
+        Gives up waiting for the rest of a sequence, a lone ESC is
+        the escape key.
+        """
+        state = self._state
+        self._state = _GROUND
+        if state == _ESCAPE:
+            return [KEY_ESC]
+        if state in (_CSI, _SS3):
+            return [keystroke_from_str("\u001b" + self._sequence)]
+        return []
+
+    def _end_sequence(self, keys: List[int]):
+        self._state = _GROUND
+        sequence = self._sequence
+        key = _SEQUENCES.get(sequence)
+        keys.append(key if key is not None else keystroke_from_str("\u001b" + sequence))
@@ -0,0 +1,222 @@
+from abc import ABC, abstractmethod
+from typing import Iterator, List, Optional, Union
+
+from .base import Rect
+from .view import View
+
+
+class Size:
+    """
+    How much room a layout item takes along an axis, bounded by
+    min_size and max_size cells.
+    """
+
+    def __init__(self, min_size: int = 0, max_size: Optional[int] = None):
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def clamp(self, cells: int) -> int:
+        if self.max_size is not None:
+            cells = min(cells, self.max_size)
+        return max(cells, self.min_size)
+
+
+class Fixed(Size):
+    def __init__(self, cells: int, min_size: int = 0, max_size: Optional[int] = None):
+        super().__init__(min_size, max_size)
+        self.cells = cells
+
+
+class Percent(Size):
+    def __init__(self, percent: float, min_size: int = 0, max_size: Optional[int] = None):
+        super().__init__(min_size, max_size)
+        self.percent = percent
+
+
+class Flex(Size):
+    """
+    Shares the room left by fixed and percent sizes with the other
+    flex items, in proportion to their weights.
+    """
+
+    def __init__(self, weight: float = 1, min_size: int = 0, max_size: Optional[int] = None):
+        super().__init__(min_size, max_size)
+        self.weight = weight
+
+
+def solve(sizes: List[Size], total: int) -> List[int]:
+    """
+    Splits total cells among sizes.
+    """
+    result = [0] * len(sizes)
+    flexible = []
+    remaining = total
+    for i, size in enumerate(sizes):
+        if isinstance(size, Fixed):
+            result[i] = size.clamp(size.cells)
+        elif isinstance(size, Percent):
+            result[i] = size.clamp(int(total * size.percent / 100))
+        else:
+            flexible.append(i)
+            continue
+        remaining -= result[i]
+
+    # Flex items whose share falls outside their bounds are frozen at the
+    # bound and the rest is split again among the others.
+    while flexible:
+        weight = sum(sizes[i].weight for i in flexible) or 1
+        available = max(remaining, 0)
+        shares = {i: int(available * sizes[i].weight / weight) for i in flexible}
+        frozen = [i for i in flexible if sizes[i].clamp(shares[i]) != shares[i]]
+        if not frozen:
+            leftover = available - sum(shares.values())
+            for i in flexible:
+                if leftover <= 0:
+                    break
+                if sizes[i].max_size is None or shares[i] < sizes[i].max_size:
+                    shares[i] += 1
+                    leftover -= 1
+            for i in flexible:
+                result[i] = shares[i]
+            break
+        for i in frozen:
+            result[i] = sizes[i].clamp(shares[i])
+            remaining -= result[i]
+            flexible.remove(i)
+    return result
+
+
+class Layout(ABC):
+    """
+    Base of layouts, arranges views and nested layouts inside a rect.
+    Computed rects are kept until the rect or the items change.
+    """
+
+    def __init__(self):
+        self._items = []
+        self._parent = None
+        self._rect = None
+        self._valid = False
+
+    def invalidate(self):
+        self._valid = False
+        if self._parent:
+            self._parent.invalidate()
+
+    def _add_item(self, child: Union[View, "Layout"], *params):
+        if isinstance(child, Layout):
+            child._parent = self
+        self._items.append((child,) + params)
+        self.invalidate()
+
+    def remove(self, child: Union[View, "Layout"]) -> "Layout":
+        self._items = [item for item in self._items if item[0] is not child]
+        if isinstance(child, Layout):
+            child._parent = None
+        self.invalidate()
+        return self
+
+    def views(self) -> Iterator[View]:
+        """
+        Returns all the views in this layout and the nested ones
+        """
+        for item in self._items:
+            child = item[0]
+            if isinstance(child, Layout):
+                yield from child.views()
+            else:
+                yield child
+
+    def apply(self, rect: Rect):
+        """
+        Sets the rects of all the items to fit in rect.
+        """
+        if self._valid and rect == self._rect:
+            return
+        self._rect = rect.frozen()
+        for item, child_rect in zip(self._items, self._compute(self._rect)):
+            child = item[0]
+            if isinstance(child, Layout):
+                child.apply(child_rect)
+            elif child.rect != child_rect:
+                child.set_rect(child_rect)
+                child.queue_update()
+        self._valid = True
+
+    @abstractmethod
+    def _compute(self, rect: Rect) -> List[Rect]:
+        """
+        Returns the rects of the items, in the order they were added
+        """
+
+
+class _Box(Layout):
+    def __init__(self, spacing: int = 0):
+        super().__init__()
+        self._spacing = spacing
+
+    def add(self, child: Union[View, Layout], size: Size = None) -> "_Box":
+        self._add_item(child, size or Flex())
+        return self
+
+    def _split(self, total: int) -> List[int]:
+        spacing = self._spacing * max(len(self._items) - 1, 0)
+        return solve([item[1] for item in self._items], max(total - spacing, 0))
+
+
+class HBox(_Box):
+    """
+    Lays out items left to right
+    """
+
+    def _compute(self, rect: Rect) -> List[Rect]:
+        rects = []
+        x = rect.x
+        for width in self._split(rect.width):
+            rects.append(Rect(x, rect.y, width, rect.height))
+            x += width + self._spacing
+        return rects
+
+
+class VBox(_Box):
+    """
+    Lays out items top to bottom
+    """
+
+    def _compute(self, rect: Rect) -> List[Rect]:
+        rects = []
+        y = rect.y
+        for height in self._split(rect.height):
+            rects.append(Rect(rect.x, y, rect.width, height))
+            y += height + self._spacing
+        return rects
+
+
+class Grid(Layout):
+    """
+    Lays out items in cells of a grid, items can span several columns
+    and rows.
+    """
+
+    def __init__(self, columns: List[Size], rows: List[Size]):
+        super().__init__()
+        self._columns = columns
+        self._rows = rows
+
+    def add(
+        self, child: Union[View, Layout], column: int, row: int, column_span: int = 1, row_span: int = 1
+    ) -> "Grid":
+        self._add_item(child, column, row, column_span, row_span)
+        return self
+
+    def _compute(self, rect: Rect) -> List[Rect]:
+        widths = solve(self._columns, rect.width)
+        heights = solve(self._rows, rect.height)
+        xs = [rect.x + sum(widths[:i]) for i in range(len(widths) + 1)]
+        ys = [rect.y + sum(heights[:i]) for i in range(len(heights) + 1)]
+        rects = []
+        for _, column, row, column_span, row_span in self._items:
+            last_column = min(column + column_span, len(widths))
+            last_row = min(row + row_span, len(heights))
+            rects.append(Rect(xs[column], ys[row], xs[last_column] - xs[column], ys[last_row] - ys[row]))
+        return rects
@@ -1,9 +1,11 @@
+import collections
 import logging
+import threading
 import traceback
 from abc import ABC, abstractmethod
-from typing import Generic, List, Optional, TypeVar
+from typing import Callable, Generic, List, Optional, TypeVar
 
-from . import ansi, kbd
+from . import ansi, kbd, theme
 from .listener import ListenerHandler
 from .view import View
 
@@ -13,6 +15,7 @@ T = TypeVar("T")
 class ListModel(ABC, Generic[T]):
     def __init__(self):
         self._on_list_changed = ListenerHandler(self)
+        self._on_range_changed = ListenerHandler(self)
 
     @property
     def on_list_changed(self) -> ListenerHandler:
@@ -21,6 +24,17 @@ class ListModel(ABC, Generic[T]):
     def notify_list_changed(self):
         self._on_list_changed()
 
+    @property
+    def on_range_changed(self) -> ListenerHandler:
+        """
+        Called with (start, stop) when the items in that range changed but
+        the list is otherwise the same, views keep their position.
+        """
+        return self._on_range_changed
+
+    def notify_range_changed(self, start: int, stop: int):
+        self._on_range_changed(start, stop)
+
     @abstractmethod
     def get_item_count(self) -> int:
         pass
@@ -29,6 +43,13 @@ class ListModel(ABC, Generic[T]):
     def get_item(self, index: int) -> Optional[T]:
         pass
 
+    def get_items(self, start: int, stop: int) -> List[Optional[T]]:
+        """
+        Returns the items from start to stop, not included. Models with
+        slow storage should override it to fetch them all at once.
+        """
+        return [self.get_item(i) for i in range(start, stop)]
+
 
 class DefaultListModel(ListModel[T]):
     def __init__(self, items=[]):
@@ -41,8 +62,13 @@ class DefaultListModel(ListModel[T]):
     def get_item(self, index: int) -> T:
         return self._items[index]
 
-    def get_items(self) -> List[T]:
-        return self._items
+    def get_items(self, start: int = None, stop: int = None) -> List[T]:
+        """
+        Returns the items from start to stop, all of them by default
+        """
+        if start is None and stop is None:
+            return self._items
+        return self._items[start:stop]
 
     def set_items(self, items: Optional[List[T]]):
         self._items = items or []
@@ -51,6 +77,145 @@ class DefaultListModel(ListModel[T]):
     items = property(get_items, set_items)
 
 
+class LazyListModel(ListModel[T]):
+    """
+    Model for big lists loaded a page at a time, ie from a database.
+    fetch(start, stop) is called from a background thread to load the
+    pages around the ones views ask for, only the last max_pages used are
+    kept. Items not loaded yet are returned as placeholder, and once their
+    page arrives on_range_changed is notified, from the loader thread,
+    so views paint them.
+    """
+
+    def __init__(
+        self,
+        item_count: int,
+        fetch: Callable[[int, int], List[T]],
+        page_size: int = 100,
+        max_pages: int = 50,
+        prefetch: int = 1,
+        placeholder: Optional[T] = None,
+    ):
+        super().__init__()
+        self._item_count = item_count
+        self._fetch = fetch
+        self._page_size = page_size
+        self._max_pages = max_pages
+        self._prefetch = prefetch
+        self._placeholder = placeholder
+        # Loaded pages by page number, least recently used first
+        self._pages = collections.OrderedDict()
+        # Pages waiting for the loader, newest requests last
+        self._requests = collections.deque()
+        self._condition = threading.Condition()
+        self._loading = None
+        self._loader = None
+        self._generation = 0
+
+    def get_item_count(self) -> int:
+        return self._item_count
+
+    def set_item_count(self, item_count: int):
+        """
+        Sets a new item count and discards all the loaded pages
+        """
+        self._item_count = item_count
+        self.invalidate(notify=False)
+        self.notify_list_changed()
+
+    def invalidate(self, notify: bool = True):
+        """
+        Discards the loaded pages, they are fetched again when needed
+        """
+        with self._condition:
+            self._pages.clear()
+            self._requests.clear()
+            self._generation += 1
+            # A page being fetched is stale, it can be requested again
+            self._loading = None
+        if notify:
+            self.notify_range_changed(0, self._item_count)
+
+    def get_item(self, index: int) -> Optional[T]:
+        return self.get_items(index, index + 1)[0]
+
+    def get_items(self, start: int, stop: int) -> List[Optional[T]]:
+        stop = min(stop, self._item_count)
+        if start >= stop:
+            return []
+        size = self._page_size
+        first_page = start // size
+        last_page = (stop - 1) // size
+        items = []
+        missing = []
+        with self._condition:
+            for page_number in range(first_page, last_page + 1):
+                page = self._pages.get(page_number)
+                page_start = page_number * size
+                count = min(stop, page_start + size) - max(start, page_start)
+                if page is None:
+                    missing.append(page_number)
+                    items += [self._placeholder] * count
+                    continue
+                self._pages.move_to_end(page_number)
+                offset = max(start - page_start, 0)
+                chunk = page[offset : offset + count]
+                items += chunk + [self._placeholder] * (count - len(chunk))
+            for n in range(self._prefetch, 0, -1):
+                self._request(last_page + n)
+                self._request(first_page - n)
+            # Requested last to be loaded first
+            for page_number in reversed(missing):
+                self._request(page_number)
+        return items
+
+    def _request(self, page_number: int):
+        if page_number < 0 or page_number * self._page_size >= self._item_count:
+            return
+        if page_number in self._pages or page_number == self._loading:
+            return
+        if page_number in self._requests:
+            # Wanted again, moves it ahead of the older requests
+            self._requests.remove(page_number)
+        self._requests.append(page_number)
+        if len(self._requests) > self._max_pages:
+            # Requested long ago, views have moved away since
+            self._requests.popleft()
+        self._condition.notify()
+        if not self._loader:
+            self._loader = threading.Thread(target=self._load_pages, name="cdtui-list-loader", daemon=True)
+            self._loader.start()
+
+    def _load_pages(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._requests)
+                # The latest request is the closest to where views are now
+                page_number = self._loading = self._requests.pop()
+                generation = self._generation
+            start = page_number * self._page_size
+            stop = min(start + self._page_size, self._item_count)
+            try:
+                page = list(self._fetch(start, stop))
+            except Exception:
+                logging.exception("Exception fetching list items")
+                page = None
+            with self._condition:
+                stale = generation != self._generation
+                if stale:
+                    # Invalidated meanwhile, views still showing it ask again
+                    stop = min(stop, self._item_count)
+                else:
+                    self._loading = None
+                    if page is None:
+                        continue
+                    self._pages[page_number] = page
+                    while len(self._pages) > self._max_pages:
+                        self._pages.popitem(last=False)
+            if start < stop:
+                self.notify_range_changed(start, stop)
+
+
 class ListView(View):
     def __init__(self, rect=None, model=None, selectable=False):
         super().__init__(rect)
@@ -60,6 +225,9 @@ class ListView(View):
         self._current_index = -1
         self._selected_index = -1
         self._on_select = ListenerHandler(self)
+        # Rendered rows by index as (item, (current, selected, width, generation, theme version), row)
+        self._row_cache = {}
+        self._row_generation = 0
         self.set_model(model)
         self._item_renderer = self._default_render
 
@@ -92,13 +260,30 @@ class ListView(View):
     def set_model(self, model):
         if self._model:
             self._model.on_list_changed.remove(self._model_changed)
+            self._model.on_range_changed.remove(self._range_changed)
 
         self._model = model
+        self.invalidate_rows()
 
         if self._model:
             self._model.on_list_changed.add(self._model_changed)
+            self._model.on_range_changed.add(self._range_changed)
+
+    def invalidate_rows(self):
+        """
+        Makes all rows be rendered again on the next update, needed when
+        the renderer output depends on something else than the item.
+        Can be called from any thread.
+        """
+        self._row_generation += 1
+
+    def set_focused(self, focused: bool):
+        if focused != self._focused:
+            self.invalidate_rows()
+        super().set_focused(focused)
 
     def _model_changed(self, *_):
+        self.invalidate_rows()
         self._current_index = 0 if self._model.get_item_count() > 0 else -1
         self._scroll_y = 0
         # if self._current_index >= self._model.get_item_count():
@@ -111,6 +296,12 @@ class ListView(View):
 
         self.queue_update()
 
+    def _range_changed(self, model, start, stop):
+        # May come from another thread, queue_update() can take it
+        if start < self._scroll_y + self._rect.height and stop > self._scroll_y:
+            self.invalidate_rows()
+            self.queue_update()
+
     def get_model(self):
         return self._model
 
@@ -121,6 +312,7 @@ class ListView(View):
             self._item_renderer = self._default_render
         else:
             self._item_renderer = item_renderer
+        self.invalidate_rows()
         self.queue_update()
 
     def get_item_renderer(self):
@@ -147,24 +339,33 @@ class ListView(View):
 
             current_index = self._current_index - self._scroll_y if self._current_index != -1 else -1
             selected_index = (self._selected_index - self._scroll_y) if self._selected_index != -1 else -1
-            for i in range(from_index, to_index + 1):
-                item = self._model.get_item(i)
+            self.hint_scroll(self._scroll_y)
+            items = self._model.get_items(from_index, to_index + 1)
+            width = self._rect.width
+            generation = self._row_generation
+            theme_version = theme.version
+            cache = self._row_cache
+            rows = {}
+            ui_buff = ansi.begin()
+            for i, item in enumerate(items, from_index):
                 item_index = i - self._scroll_y
 
                 current = item_index == current_index
                 selected = self._selectable and item_index == selected_index
 
-                text = self.render_item(item, current, selected)
-                (
-                    ansi.begin()
-                    .gotoxy(self._rect.x, self._rect.y + i - self._scroll_y)
-                    .writefill(text, self._rect.width)
-                ).put()
+                key = (current, selected, width, generation, theme_version)
+                entry = cache.get(i)
+                if entry is None or entry[0] is not item or entry[1] != key:
+                    text = self.render_item(item, current, selected)
+                    entry = (item, key, str(ansi.begin().writefill(text, width)))
+                rows[i] = entry
+                ui_buff.gotoxy(self._rect.x, self._rect.y + item_index).write(entry[2])
+            # Only the visible rows are kept
+            self._row_cache = rows
 
             last_y = self._rect.y + (to_index + 1 - from_index)
             max_y = self._rect.y + self._rect.height - 1
 
-            ui_buff = ansi.begin()
             while last_y <= max_y:
                 ui_buff.gotoxy(self._rect.x, last_y).writefill("", self._rect.width)
                 last_y += 1
@@ -191,35 +392,50 @@ class ListView(View):
         except Exception:
             logging.exception("Exception on key handler")
 
-    def _scroll_up(self):
+    def on_key_repeat(self, key, count):
+        try:
+            if key == kbd.KEY_UP:
+                self._scroll_up(count)
+            elif key == kbd.KEY_DOWN:
+                self._scroll_down(count)
+            elif key == kbd.KEY_PGDN:
+                self._page_down(count)
+            elif key == kbd.KEY_PGUP:
+                self._page_up(count)
+            else:
+                super().on_key_repeat(key, count)
+        except Exception:
+            logging.exception("Exception on key handler")
+
+    def _scroll_up(self, count=1):
         # item_count = self._model.get_item_count()
         if self._current_index > 0:
-            self._current_index -= 1
+            self._current_index = max(self._current_index - count, 0)
             if self._current_index - self._scroll_y < 0:
-                self._scroll_y -= 1
+                self._scroll_y = self._current_index
             self.queue_update()
         elif self._scroll_y > 0:
-            self._scroll_y -= 1
+            self._scroll_y = max(self._scroll_y - count, 0)
             self.queue_update()
 
-    def _scroll_down(self):
+    def _scroll_down(self, count=1):
         item_count = self._model.get_item_count()
         if self._current_index < item_count - 1:
-            self._current_index += 1
+            self._current_index = min(self._current_index + count, item_count - 1)
             if self._current_index - self._scroll_y >= self._rect.height:
-                self._scroll_y += 1
+                self._scroll_y = self._current_index - self._rect.height + 1
             self.queue_update()
 
-    def _page_down(self):
+    def _page_down(self, count=1):
         item_count = self._model.get_item_count()
-        self._scroll_y += self._rect.height
+        self._scroll_y += self._rect.height * count
         if self._scroll_y + self._rect.height > item_count:
             self._scroll_y = max(0, item_count - self._rect.height)
         self._current_index = self._scroll_y
         self.queue_update()
 
-    def _page_up(self):
-        self._scroll_y -= self._rect.height
+    def _page_up(self, count=1):
+        self._scroll_y -= self._rect.height * count
         if self._scroll_y < 0:
             self._scroll_y = 0
         self._current_index = self._scroll_y
@@ -0,0 +1,399 @@
+import re
+from typing import List, Optional, Tuple
+
+from . import ansi
+from .width import char_width
+
+# A cell is a (char, attributes) tuple, attributes being the SGR state
+# in effect when the char was written. The right half of a wide char is
+# stored as an empty char.
+Cell = Tuple[str, ansi.SgrState]
+
+BLANK = (" ", ansi.DEFAULT_SGR)
+
+_TOKEN = re.compile(r"\x1b\[([0-?]*)[ -/]*([@-~])|\x1b.?|[^\x1b]+")
+
+# Control chars other than TAB, they don't draw anything
+_CONTROLS = re.compile(r"[\x00-\x08\x0a-\x1f\x7f]")
+
+_TAB_SIZE = 8
+
+# Above this gap it is cheaper to move the cursor than to rewrite cells.
+_MAX_REWRITE_GAP = 4
+
+
+class Surface:
+    """
+    A layer covering a rectangular area of the screen, ie a popup.
+    Coordinates are 0 based.
+    """
+
+    def __init__(self, x: int, y: int, width: int, height: int, screen_width: int):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        # Rows span the whole screen width to keep indexes the same as the
+        # screen ones, only the cells inside the surface are used.
+        self.rows = [[BLANK] * screen_width for _ in range(height)]
+
+    def covers(self, x: int, y: int) -> bool:
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+
+class Screen:
+    """
+    Double buffered cell grid.
+    Views draw into the back buffer by writing escape sequences to it,
+    render() compares it against the front buffer, which holds what the
+    terminal is showing, and returns the output needed to update only the
+    cells that changed.
+    The back buffer is composed of a base layer and a stack of surfaces
+    above it, writes go to the layer selected with set_target().
+    """
+
+    def __init__(self, width: int, height: int):
+        self._width = 0
+        self._height = 0
+        self._base: List[List[Cell]] = []
+        self._back: List[List[Cell]] = []
+        self._front: List[List[Optional[Cell]]] = []
+        self._surfaces: List[Surface] = []
+        self._target: Optional[Surface] = None
+        # Chars written so far, to tell how much output views produce
+        self.written = 0
+        self.resize(width, height)
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @property
+    def height(self) -> int:
+        return self._height
+
+    def resize(self, width: int, height: int):
+        """
+        Sets a new size, discarding all content and surfaces
+        """
+        self._width = width
+        self._height = height
+        self._base = [[BLANK] * width for _ in range(height)]
+        # Without surfaces the composed back buffer is the base layer itself
+        self._back = self._base
+        self._surfaces = []
+        self._target = None
+        self._front = [[None] * width for _ in range(height)]
+        self._dirty_rows = set(range(height))
+        self._x = 0
+        self._y = 0
+        self._attr = ansi.DEFAULT_SGR
+        self._pending = []
+        # Scroll region set by the output, as 0 based (top, bottom)
+        self._region = None
+        # Scrolls to apply to the terminal before the changed rows, as
+        # (top, bottom, lines)
+        self._scrolls = []
+        self._out_x = None
+        self._out_y = None
+        self._out_attr = None
+
+    def invalidate(self):
+        """
+        Forgets what the terminal is showing, next render() clears it
+        and emits the whole back buffer.
+        """
+        self._front = [[BLANK] * self._width for _ in range(self._height)]
+        self._dirty_rows = set(range(self._height))
+        self._pending = [ansi.RESET + ansi.CLRSCR]
+        self._out_x = None
+        self._out_y = None
+        self._out_attr = ansi.DEFAULT_SGR
+
+    @property
+    def dirty(self) -> bool:
+        """
+        Tells if there is anything for render() to output
+        """
+        return bool(self._dirty_rows or self._pending)
+
+    def cell(self, x: int, y: int) -> Cell:
+        """
+        Returns the back buffer cell at 0 based position x, y
+        """
+        return self._back[y][x]
+
+    def line(self, y: int) -> str:
+        """
+        Returns the text of the back buffer row y, without attributes.
+        """
+        return "".join(c for c, _ in self._back[y])
+
+    def push_surface(self, x: int, y: int, width: int, height: int) -> Surface:
+        """
+        Adds a blank surface on top of the others and returns it.
+        """
+        x = max(x, 0)
+        y = max(y, 0)
+        surface = Surface(x, y, max(min(width, self._width - x), 0), max(min(height, self._height - y), 0), self._width)
+        if not self._surfaces:
+            self._back = [row[:] for row in self._base]
+        self._surfaces.append(surface)
+        self._compose_area(surface)
+        return surface
+
+    def remove_surface(self, surface: Surface):
+        """
+        Removes a surface, what was under it shows up again.
+        """
+        self._surfaces.remove(surface)
+        if self._target is surface:
+            self._target = None
+        if self._surfaces:
+            self._compose_area(surface)
+        else:
+            self._back = self._base
+            self._dirty_rows.update(range(surface.y, surface.y + surface.height))
+
+    def set_target(self, surface: Optional[Surface]):
+        """
+        Selects the surface writes go to, None for the base layer.
+        """
+        self._target = surface
+
+    def get_target(self) -> Optional[Surface]:
+        return self._target
+
+    def _compose_area(self, area: Surface):
+        for y in range(area.y, area.y + area.height):
+            self._compose(y, area.x, area.x + area.width)
+
+    def _compose(self, y: int, x0: int, x1: int):
+        """
+        Updates a span of the back buffer with the top most layer cells.
+        """
+        back = self._back[y]
+        back[x0:x1] = self._base[y][x0:x1]
+        for surface in self._surfaces:
+            if surface.y <= y < surface.y + surface.height:
+                start = max(x0, surface.x)
+                end = min(x1, surface.x + surface.width)
+                if start < end:
+                    back[start:end] = surface.rows[y - surface.y][start:end]
+        self._dirty_rows.add(y)
+
+    def write(self, data: str):
+        self.written += len(data)
+        for match in _TOKEN.finditer(data):
+            token = match.group(0)
+            if token[0] != "\u001b":
+                if "\t" in token or _CONTROLS.search(token):
+                    self._put_controls(token)
+                else:
+                    self._put_text(token)
+            elif match.group(2):
+                self._control(match.group(1), match.group(2), token)
+            else:
+                self._pending.append(token)
+
+    def _control(self, params: str, final: str, token: str):
+        if final == "m":
+            self._attr = ansi.sgr_apply(self._attr, params)
+        elif final in "Hf":
+            pos = params.split(";")
+            self._y = max(int(pos[0] or 1), 1) - 1
+            self._x = max(int(pos[1] or 1), 1) - 1 if len(pos) > 1 else 0
+        elif final == "r":
+            self._set_region(params)
+        elif final in "ST":
+            lines = max(int(params or 1), 1)
+            self._add_scroll(lines if final == "S" else -lines)
+        elif final == "J" and params == "2":
+            target = self._target
+            if target:
+                for row in target.rows:
+                    row[target.x : target.x + target.width] = [BLANK] * target.width
+                self._compose_area(target)
+            else:
+                for row in self._base:
+                    row[:] = [BLANK] * self._width
+                if self._surfaces:
+                    for y in range(self._height):
+                        self._compose(y, 0, self._width)
+                self._dirty_rows.update(range(self._height))
+        else:
+            self._pending.append(token)
+
+    def _set_region(self, params: str):
+        values = params.split(";")
+        top = int(values[0]) - 1 if values[0] else 0
+        bottom = int(values[1]) - 1 if len(values) > 1 and values[1] else self._height - 1
+        self._region = (top, bottom) if (top, bottom) != (0, self._height - 1) else None
+        self._x = 0
+        self._y = 0
+
+    def _add_scroll(self, lines: int):
+        """
+        Takes a scroll of the output as a hint that the rows shown by the
+        terminal can be shifted instead of written again, the back buffer
+        is left as it is, whoever scrolls has to draw all the rows anyway.
+        """
+        top, bottom = self._region or (0, self._height - 1)
+        if self._target or not 0 <= top < bottom < self._height:
+            return
+        for surface in self._surfaces:
+            if surface.y <= bottom and top < surface.y + surface.height:
+                return
+        if self._scrolls and self._scrolls[-1][:2] == (top, bottom):
+            lines += self._scrolls.pop()[2]
+        if 0 < abs(lines) <= bottom - top:
+            self._scrolls.append((top, bottom, lines))
+
+    def _put_controls(self, text: str):
+        """
+        Moves to the next tab stop on TAB as a terminal does, other
+        control chars are dropped.
+        """
+        for i, part in enumerate(_CONTROLS.sub("", text).split("\t")):
+            if i:
+                self._x = max(min((self._x // _TAB_SIZE + 1) * _TAB_SIZE, self._width - 1), self._x)
+            if part:
+                self._put_text(part)
+
+    def _put_text(self, text: str):
+        y = self._y
+        if y >= self._height:
+            return
+        target = self._target
+        if target:
+            if not target.y <= y < target.y + target.height:
+                return
+            row = target.rows[y - target.y]
+            left = target.x
+            width = target.x + target.width
+        else:
+            row = self._base[y]
+            left = 0
+            width = self._width
+        x = self._x
+        start = x
+        attr = self._attr
+        if x < left:
+            # Clip what falls on the left of the surface
+            while text and x < left:
+                x += char_width(text[0])
+                text = text[1:]
+            start = x
+        if left < x < width and row[x][0] == "":
+            row[x - 1] = (" ", row[x - 1][1])
+        if text.isascii():
+            text = text[: max(width - x, 0)]
+            row[x : x + len(text)] = [(char, attr) for char in text]
+            x += len(text)
+            text = ""
+        for char in text:
+            cells = char_width(char)
+            if cells == 0:
+                # Combining chars go along with the previous one
+                prev = x - 1
+                if prev > 0 and row[prev][0] == "":
+                    prev -= 1
+                if left <= prev < width:
+                    row[prev] = (row[prev][0] + char, row[prev][1])
+                continue
+            if x >= width:
+                break
+            if cells == 2:
+                if x + 1 >= width:
+                    break
+                row[x] = (char, attr)
+                row[x + 1] = ("", attr)
+                x += 2
+            else:
+                row[x] = (char, attr)
+                x += 1
+        if x < width and row[x][0] == "":
+            row[x] = (" ", row[x][1])
+        self._x = x
+        if target or self._surfaces:
+            self._compose(y, max(start - 1, left), min(x + 1, width))
+        else:
+            self._dirty_rows.add(y)
+
+    def render(self) -> str:
+        """
+        Returns the output that brings the terminal up to date with
+        the back buffer, and assumes it will be written.
+        """
+        out = self._pending
+        self._pending = []
+
+        for top, bottom, lines in self._scrolls:
+            self._render_scroll(out, top, bottom, lines)
+        self._scrolls = []
+
+        for y in sorted(self._dirty_rows):
+            back = self._back[y]
+            front = self._front[y]
+            if back != front:
+                self._render_row(out, y, back, front)
+                self._front[y] = back[:]
+        self._dirty_rows.clear()
+
+        if out and self._out_attr != ansi.DEFAULT_SGR:
+            # Leaves the terminal usable whatever happens before the next frame
+            out.append(ansi.sgr_transition(self._out_attr, ansi.DEFAULT_SGR))
+            self._out_attr = ansi.DEFAULT_SGR
+
+        return "".join(out)
+
+    def _render_scroll(self, out: List[str], top: int, bottom: int, lines: int):
+        if self._out_attr != ansi.DEFAULT_SGR:
+            # New rows get filled with the current background
+            out.append(ansi.sgr_transition(self._out_attr, ansi.DEFAULT_SGR))
+            self._out_attr = ansi.DEFAULT_SGR
+        out.append(ansi.scroll_region(top + 1, bottom + 1, lines))
+        rows = self._front[top : bottom + 1]
+        new_rows = [[BLANK] * self._width for _ in range(abs(lines))]
+        rows = rows[lines:] + new_rows if lines > 0 else new_rows + rows[:lines]
+        self._front[top : bottom + 1] = rows
+        self._dirty_rows.update(range(top, bottom + 1))
+        self._out_x = None
+        self._out_y = None
+
+    def _render_row(self, out: List[str], y: int, back: List[Cell], front: List[Optional[Cell]]):
+        width = self._width
+        x = 0
+        while x < width:
+            if back[x] == front[x]:
+                x += 1
+                continue
+            if back[x][0] == "" and x > 0 and back[x - 1][0] and char_width(back[x - 1][0][0]) == 2:
+                # Right half of a wide char, the whole char has to be written.
+                x -= 1
+            self._move_to(out, x, y, back)
+            char, attr = back[x]
+            if attr != self._out_attr:
+                out.append(ansi.sgr_transition(self._out_attr, attr))
+                self._out_attr = attr
+            out.append(char or " ")
+            x += 2 if back[x + 1 : x + 2] == [("", attr)] and char else 1
+            self._out_x = x if x < width else None
+
+    def _move_to(self, out: List[str], x: int, y: int, back: List[Cell]):
+        out_x = self._out_x
+        if self._out_y == y and out_x is not None:
+            gap = x - out_x
+            if gap == 0:
+                return
+            if 0 < gap <= _MAX_REWRITE_GAP:
+                cells = back[out_x:x]
+                if all(a == self._out_attr and c for c, a in cells):
+                    # Rewriting a few unchanged cells is shorter than a cursor move.
+                    out.append("".join(c for c, _ in cells))
+                    return
+            if gap > 0:
+                out.append(f"\u001b[{gap}C")
+                return
+        out.append(ansi.cup(x + 1, y + 1))
+        self._out_y = y
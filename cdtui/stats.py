@@ -0,0 +1,229 @@
+import bisect
+import collections
+import json
+import logging
+import time
+import weakref
+from typing import Callable, Dict, List
+
+from . import ansi
+from .base import Rect
+from .view import View
+
+# Upper bounds in seconds of the histogram buckets, the last one takes the rest
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.016, 0.033, 0.05, 0.1, 0.25, 0.5, 1.0, float("inf"))
+
+
+class Histogram:
+    """
+    Counts of durations by bucket, along with their total and extremes.
+    """
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.min = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        if not self.count or seconds < self.min:
+            self.min = seconds
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """
+        Returns the upper bound of the bucket the given percentile falls in,
+        never above the max.
+        """
+        wanted = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if count and seen >= wanted:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": {str(bound): count for bound, count in zip(BUCKETS, self.counts) if count},
+        }
+
+
+class ViewStats:
+    """
+    Update count, time and output of a view, or of all the views of a class.
+    """
+
+    __slots__ = ("name", "count", "total", "max", "chars")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.chars = 0
+
+    def add(self, seconds: float, chars: int):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.chars += chars
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self) -> dict:
+        return {"count": self.count, "total": self.total, "mean": self.mean, "max": self.max, "chars": self.chars}
+
+
+class Stats:
+    """
+    Profiling data of an application: time and output of the updates of
+    the views it paints, by class and instance, along with the time taken
+    to dispatch keys and to paint frames.
+    Nothing gets recorded until enabled.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self._by_class: Dict[str, ViewStats] = {}
+        self._by_view = weakref.WeakKeyDictionary()
+        self.key_dispatch = Histogram()
+        self.frame = Histogram()
+        self.frame_bytes = 0
+        self._recent_frames = collections.deque()
+        self._since = time.monotonic()
+
+    def record_view(self, view: View, seconds: float, chars: int):
+        name = type(view).__name__
+        stats = self._by_class.get(name)
+        if stats is None:
+            stats = self._by_class[name] = ViewStats(name)
+        stats.add(seconds, chars)
+        stats = self._by_view.get(view)
+        if stats is None:
+            stats = self._by_view[view] = ViewStats(f"{name}@{id(view):x}")
+        stats.add(seconds, chars)
+
+    def record_key(self, seconds: float):
+        self.key_dispatch.add(seconds)
+
+    def record_frame(self, seconds: float, sent_bytes: int):
+        self.frame.add(seconds)
+        self.frame_bytes += sent_bytes
+        now = time.monotonic()
+        self._recent_frames.append(now)
+        while self._recent_frames[0] < now - 1:
+            self._recent_frames.popleft()
+
+    def fps(self) -> int:
+        """
+        Returns how many frames were painted in the last second
+        """
+        now = time.monotonic()
+        return sum(1 for when in self._recent_frames if when >= now - 1)
+
+    def by_class(self) -> List[ViewStats]:
+        """
+        Returns the stats of every view class, slowest first
+        """
+        return sorted(self._by_class.values(), key=lambda stats: stats.total, reverse=True)
+
+    def by_view(self) -> List[ViewStats]:
+        """
+        Returns the stats of every view still alive, slowest first
+        """
+        return sorted(self._by_view.values(), key=lambda stats: stats.total, reverse=True)
+
+    def snapshot(self) -> dict:
+        """
+        Returns all the data as a dict that can be dumped as JSON
+        """
+        return {
+            "timestamp": time.time(),
+            "seconds": time.monotonic() - self._since,
+            "fps": self.fps(),
+            "frame": self.frame.as_dict(),
+            "frame_bytes": self.frame_bytes,
+            "key_dispatch": self.key_dispatch.as_dict(),
+            "classes": {stats.name: stats.as_dict() for stats in self.by_class()},
+            "views": {stats.name: stats.as_dict() for stats in self.by_view()},
+        }
+
+
+def log_exporter(logger: logging.Logger = None, level: int = logging.INFO) -> Callable[[dict], None]:
+    """
+    Returns an exporter for Application.set_stats_exporter() that logs
+    the snapshots as JSON.
+    """
+    logger = logger or logging.getLogger(__name__)
+    return lambda snapshot: logger.log(level, "Stats: %s", json.dumps(snapshot))
+
+
+def file_exporter(path: str) -> Callable[[dict], None]:
+    """
+    Returns an exporter for Application.set_stats_exporter() that appends
+    the snapshots to a file, one JSON document per line.
+    """
+
+    def export(snapshot: dict):
+        with open(path, "a") as f:
+            f.write(json.dumps(snapshot) + "\n")
+
+    return export
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:6.2f}ms"
+
+
+class StatsHud(View):
+    """
+    Overlay showing the frame rate, frame and key dispatch times and
+    the slowest view classes.
+    """
+
+    WIDTH = 46
+    HEIGHT = 7
+
+    def __init__(self, stats: Stats):
+        super().__init__(Rect(1, 1, self.WIDTH, self.HEIGHT))
+        self._stats = stats
+        self._focusable = False
+
+    def update(self):
+        stats = self._stats
+        lines = [
+            f" {stats.fps():3} fps {stats.frame.count:8} frames {stats.frame_bytes:10}b",
+            f" frame p50 {_ms(stats.frame.percentile(50))} p99 {_ms(stats.frame.percentile(99))}",
+            f" keys  p50 {_ms(stats.key_dispatch.percentile(50))} p99 {_ms(stats.key_dispatch.percentile(99))}",
+        ]
+        for view_stats in stats.by_class()[: self._rect.height - len(lines)]:
+            lines.append(f" {view_stats.name[:16]:16} {view_stats.count:7} {_ms(view_stats.mean)} avg")
+
+        rect = self._rect
+        buff = ansi.begin().write(self.get_color("bg")).write(self.get_color("fg"))
+        for i in range(rect.height):
+            line = lines[i] if i < len(lines) else ""
+            buff.gotoxy(rect.x, rect.y + i).writefill(line[: rect.width], rect.width)
+        buff.reset().put()
@@ -1,7 +1,7 @@
 import logging
 
 from . import ansi, kbd
-from .base import COLORS, Rect
+from .base import Rect
 from .view import View
 
 _logger = logging.getLogger(__name__)
@@ -28,8 +28,24 @@ class TabbedView(View):
 
     def add_tab(self, title: str, view: View):
         view.application = self.application
+        view.parent = self
+        view.set_rect(self._inner_rect())
+        # Only the active tab paints, the first one until another is chosen
+        view.visible = not self._tabs
         self._tabs.append(TabbedView.Tab(title, view))
 
+    def set_rect(self, rect: Rect):
+        super().set_rect(rect)
+        for tab in self._tabs:
+            child_rect = tab.view.rect
+            # Tabs own their rects, a new one only when the area changes
+            if child_rect is None or not child_rect.matches(rect.x, rect.y + 1, rect.width, rect.height - 1):
+                tab.view.set_rect(self._inner_rect())
+
+    def _inner_rect(self) -> Rect:
+        rect = self._rect
+        return Rect(rect.x, rect.y + 1, rect.width, rect.height - 1)
+
     def set_application(self, application):
         super().set_application(application)
         for tab in self._tabs:
@@ -78,10 +94,6 @@ class TabbedView(View):
         (ansi.begin().gotoxy(self._rect.x, self._rect.y).write(header).reset()).put()
 
         if active_tab:
-            inner_rect = self._rect.copy()
-            inner_rect.y += 1
-            inner_rect.height -= 1
-            active_tab.view.set_rect(inner_rect)
             active_tab.view.update()
 
     def _set_active(self, active: int):
@@ -104,3 +116,15 @@ class TabbedView(View):
             active = self.active_tab
             if active:
                 active.view.on_key_press(key)
+
+    def on_key_repeat(self, key, count):
+        if key == kbd.KEY_RIGHT:
+            if self._active < len(self._tabs) - 1:
+                self._set_active(min(self._active + count, len(self._tabs) - 1))
+        elif key == kbd.KEY_LEFT:
+            if self._active > 0:
+                self._set_active(max(self._active - count, 0))
+        else:
+            active = self.active_tab
+            if active:
+                active.view.on_key_repeat(key, count)
@@ -0,0 +1,338 @@
+import collections
+import fcntl
+import os
+import select
+import signal
+import sys
+import termios
+import threading
+import tty
+from abc import ABC, abstractmethod
+from typing import Tuple
+
+from . import ansi
+
+# Terminals known to show garbage, or nothing useful, on DEC private mode 2026.
+_NO_SYNC_TERMS = ("dumb", "linux", "vt100", "vt102", "vt220")
+
+_FRAME_BUFFER_SIZE = 64 * 1024
+
+# Seconds to wait for queued output when closing
+_DRAIN_TIMEOUT = 5
+
+_SYNC_BEGIN = ansi.SYNC_BEGIN.encode()
+_SYNC_END = ansi.SYNC_END.encode()
+
+
+def supports_synchronized_output() -> bool:
+    """
+    Tells whether to wrap frames in synchronized update sequences.
+    CDTUI_SYNC_OUTPUT=0/1 forces it, otherwise any terminal but a few
+    legacy ones is assumed to either support it or ignore it.
+    """
+    forced = os.environ.get("CDTUI_SYNC_OUTPUT")
+    if forced is not None:
+        return forced not in ("", "0", "no", "false")
+    return os.environ.get("TERM", "dumb") not in _NO_SYNC_TERMS
+
+
+class TerminalOutput:
+    """
+    Collects all the output of a frame and sends it to the terminal
+    in a single write.
+    When threaded, frames are written from a writer thread so a slow
+    terminal doesn't block the caller. The output is busy while
+    max_pending frames wait to be written, callers should then hold new
+    output back and send it merged with the next one once ready.
+    """
+
+    def __init__(self, fd: int = None, synchronized: bool = None, threaded: bool = True, max_pending: int = 1):
+        self._fd = fd
+        self._synchronized = supports_synchronized_output() if synchronized is None else synchronized
+        # Preallocated frame buffer, only _frame_size bytes of it are used
+        self._frame = bytearray(_FRAME_BUFFER_SIZE)
+        self._frame_size = 0
+        self._threaded = threaded
+        self._max_pending = max_pending
+        # Frames waiting for the writer as (buffer, size, fd), and
+        # buffers already written that can be used again.
+        self._pending = collections.deque()
+        self._free_frames = collections.deque()
+        self._condition = threading.Condition()
+        self._writer = None
+        self._ready_callback = None
+
+    def set_synchronized(self, synchronized: bool):
+        self._synchronized = synchronized
+
+    def get_synchronized(self) -> bool:
+        return self._synchronized
+
+    synchronized = property(get_synchronized, set_synchronized)
+
+    @property
+    def busy(self) -> bool:
+        """
+        Tells if the terminal is behind and more output would only queue up
+        """
+        return len(self._pending) >= self._max_pending
+
+    def set_ready_callback(self, callback):
+        """
+        Sets a function to call from the writer thread every time a frame
+        is written and the output is no longer busy.
+        """
+        self._ready_callback = callback
+
+    def write(self, data: str):
+        if data:
+            if not self._frame_size and self._synchronized:
+                self._frame_size = ansi.copy_into(self._frame, 0, _SYNC_BEGIN)
+            self._frame_size = ansi.copy_into(self._frame, self._frame_size, data.encode())
+
+    def flush(self):
+        if not self._frame_size:
+            return
+        if self._synchronized:
+            self._frame_size = ansi.copy_into(self._frame, self._frame_size, _SYNC_END)
+        try:
+            sys.stdout.flush()
+            fd = self._fd if self._fd is not None else sys.stdout.fileno()
+        except Exception:
+            self._frame_size = 0
+            return
+        if self._threaded:
+            self._queue_frame(fd)
+            return
+        try:
+            with memoryview(self._frame) as frame:
+                _write_all(fd, frame[: self._frame_size])
+        except Exception:
+            pass
+        self._frame_size = 0
+
+    def drain(self, timeout: float = None) -> bool:
+        """
+        Waits until all the queued frames are written, returns False
+        if they weren't within the timeout.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending, timeout)
+
+    def _queue_frame(self, fd: int):
+        with self._condition:
+            self._pending.append((self._frame, self._frame_size, fd))
+            self._condition.notify_all()
+        self._frame = self._free_frames.popleft() if self._free_frames else bytearray(_FRAME_BUFFER_SIZE)
+        self._frame_size = 0
+        if not self._writer:
+            self._writer = threading.Thread(target=self._write_frames, name="cdtui-writer", daemon=True)
+            self._writer.start()
+
+    def _write_frames(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+                frame, size, fd = self._pending[0]
+            try:
+                with memoryview(frame) as view:
+                    _write_all(fd, view[:size])
+            except Exception:
+                pass
+            with self._condition:
+                self._pending.popleft()
+                self._free_frames.append(frame)
+                ready = len(self._pending) < self._max_pending
+                self._condition.notify_all()
+            if ready and self._ready_callback:
+                try:
+                    self._ready_callback()
+                except Exception:
+                    pass
+
+
+def _write_all(fd: int, data: bytes):
+    # The tty may be shared with stdin, which is non blocking
+    view = memoryview(data)
+    while view:
+        try:
+            written = os.write(fd, view)
+        except BlockingIOError:
+            select.select([], [fd], [])
+            continue
+        view = view[written:]
+
+
+class Terminal(ABC):
+    """
+    Base of terminal backends, where an application reads its input
+    from and sends its output to.
+    """
+
+    def open(self):
+        """
+        Gets the terminal ready for the application, ie raw mode
+        """
+        pass
+
+    def close(self):
+        """
+        Leaves the terminal as it was before open()
+        """
+        pass
+
+    @abstractmethod
+    def fileno(self) -> int:
+        """
+        Returns the file descriptor to wait on for input
+        """
+
+    def read(self) -> bytes:
+        """
+        Returns all the input available without blocking, raises
+        EOFError once the input is closed and everything was read.
+        """
+        return _read_available(self.fileno())
+
+    @abstractmethod
+    def size(self) -> Tuple[int, int]:
+        """
+        Returns the terminal (rows, columns)
+        """
+
+    def invalidate_size(self):
+        pass
+
+    @abstractmethod
+    def write(self, data: str):
+        """
+        Queues output, it is sent on flush()
+        """
+
+    def flush(self):
+        pass
+
+    def watch_resize(self, callback):
+        """
+        Calls callback() when the terminal size changes, it may be
+        called from a signal handler or another thread.
+        """
+        pass
+
+    def unwatch_resize(self):
+        pass
+
+    @property
+    def busy(self) -> bool:
+        """
+        Tells if the terminal is behind with the output already flushed,
+        output should be held back until it is ready again.
+        """
+        return False
+
+    def watch_ready(self, callback):
+        """
+        Calls callback(), possibly from another thread, when the terminal
+        can take more output after being busy.
+        """
+        pass
+
+    def unwatch_ready(self):
+        pass
+
+    def set_synchronized(self, synchronized: bool):
+        pass
+
+    def get_synchronized(self) -> bool:
+        return False
+
+    synchronized = property(get_synchronized, set_synchronized)
+
+
+class TtyTerminal(Terminal):
+    """
+    The terminal the process runs on, input from stdin and
+    output to stdout.
+    """
+
+    def __init__(self):
+        self._output = TerminalOutput()
+        self._term_attrs = None
+        self._file_flags = None
+        self._prev_sigwinch = None
+
+    def open(self):
+        self._term_attrs = termios.tcgetattr(sys.stdin)
+        tty.setraw(sys.stdin)
+        self._file_flags = fcntl.fcntl(sys.stdin, fcntl.F_GETFL)
+        fcntl.fcntl(sys.stdin, fcntl.F_SETFL, self._file_flags | os.O_NONBLOCK)
+        ansi.invalidate_terminal_size()
+
+    def close(self):
+        # Whatever is still queued is written with the terminal settings in use
+        self._output.drain(_DRAIN_TIMEOUT)
+        if self._term_attrs:
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, self._term_attrs)
+        if self._file_flags is not None:
+            fcntl.fcntl(sys.stdin, fcntl.F_SETFL, self._file_flags)
+
+    def fileno(self) -> int:
+        return sys.stdin.fileno()
+
+    def size(self) -> Tuple[int, int]:
+        return ansi.terminal_size()
+
+    def invalidate_size(self):
+        ansi.invalidate_terminal_size()
+
+    def write(self, data: str):
+        self._output.write(data)
+
+    def flush(self):
+        self._output.flush()
+
+    def watch_resize(self, callback):
+        try:
+            self._prev_sigwinch = signal.signal(signal.SIGWINCH, lambda *_: callback())
+        except ValueError:
+            # Not running on the main thread
+            self._prev_sigwinch = None
+
+    def unwatch_resize(self):
+        if self._prev_sigwinch is not None:
+            signal.signal(signal.SIGWINCH, self._prev_sigwinch)
+            self._prev_sigwinch = None
+
+    @property
+    def busy(self) -> bool:
+        return self._output.busy
+
+    def watch_ready(self, callback):
+        self._output.set_ready_callback(callback)
+
+    def unwatch_ready(self):
+        self._output.set_ready_callback(None)
+
+    def set_synchronized(self, synchronized: bool):
+        self._output.synchronized = synchronized
+
+    def get_synchronized(self) -> bool:
+        return self._output.synchronized
+
+    synchronized = property(get_synchronized, set_synchronized)
+
+
+def _read_available(fd: int) -> bytes:
+    data = b""
+    try:
+        while True:
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                if not data:
+                    raise EOFError()
+                # The end is reported on the next read
+                break
+            data += chunk
+    except BlockingIOError:
+        pass
+    return data
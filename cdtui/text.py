@@ -39,6 +39,7 @@ class TextView(View):
         height = self._rect.height
         width = self._rect.width
 
+        self.hint_scroll(self._scroll_y)
         chunk = self._text[self._scroll_y : self._scroll_y + height]
         chunk = [l[self._scroll_x : self._scroll_x + width] for l in chunk]
 
@@ -71,38 +72,54 @@ class TextView(View):
         elif input_key == kbd.KEY_HOME:
             self._home()
 
+    def on_key_repeat(self, input_key, count):
+        if input_key == kbd.KEY_DOWN:
+            self._scroll_down(count)
+        elif input_key == kbd.KEY_UP:
+            self._scroll_up(count)
+        elif input_key == kbd.KEY_LEFT:
+            self._scroll_left(count)
+        elif input_key == kbd.KEY_RIGHT:
+            self._scroll_right(count)
+        elif input_key == kbd.KEY_PGUP:
+            self._page_up(count)
+        elif input_key == kbd.KEY_PGDN:
+            self._page_down(count)
+        else:
+            super().on_key_repeat(input_key, count)
+
     def _home(self):
         self._scroll_y = 0
         self._scroll_x = 0
         self.queue_update()
 
-    def _page_down(self):
-        self._scroll_y += self._rect.height
+    def _page_down(self, count=1):
+        self._scroll_y += self._rect.height * count
         if self._scroll_y + self._rect.height >= len(self._text):
             self._scroll_y = len(self._text) - self._rect.height - 1
         self.queue_update()
 
-    def _page_up(self):
-        self._scroll_y -= self._rect.height
+    def _page_up(self, count=1):
+        self._scroll_y -= self._rect.height * count
         if self._scroll_y < 0:
             self._scroll_y = 0
         self.queue_update()
 
-    def _scroll_down(self):
+    def _scroll_down(self, count=1):
         if self._scroll_y + self._rect.height < len(self._text) - 1:
-            self._scroll_y += 1
+            self._scroll_y = min(self._scroll_y + count, len(self._text) - 1 - self._rect.height)
             self.queue_update()
 
-    def _scroll_up(self):
+    def _scroll_up(self, count=1):
         if self._scroll_y > 0:
-            self._scroll_y -= 1
+            self._scroll_y = max(self._scroll_y - count, 0)
             self.queue_update()
 
-    def _scroll_right(self):
-        self._scroll_x += 1
+    def _scroll_right(self, count=1):
+        self._scroll_x += count
         self.queue_update()
 
-    def _scroll_left(self):
+    def _scroll_left(self, count=1):
         if self._scroll_x > 0:
-            self._scroll_x -= 1
+            self._scroll_x = max(self._scroll_x - count, 0)
             self.queue_update()
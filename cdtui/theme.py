@@ -0,0 +1,48 @@
+from typing import Dict
+
+from .base import COLORS
+
+# Colors in use, a dict like base.COLORS. Views look colors up in style
+# tables compiled from it, so changing it in place, COLORS included, shows
+# only after calling invalidate().
+_colors = COLORS
+
+# Bumped every time the theme changes, so views know their style tables are stale.
+version = 0
+
+_tables = {}
+
+
+def set_theme(colors: Dict[str, str]):
+    global _colors
+    _colors = colors
+    invalidate()
+
+
+def get_theme() -> Dict[str, str]:
+    return _colors
+
+
+def invalidate():
+    """
+    Discards the compiled style tables, needed after changing the
+    colors dict in place, ie COLORS["textview.bg"] = ..., views keep
+    the old colors until then.
+    """
+    global version
+    version += 1
+    _tables.clear()
+
+
+def style_table(prefix: str, focused: bool) -> Dict[str, str]:
+    """
+    Returns the colors for a color key prefix and focus state, keyed by
+    the color name, ie "bg" or "selected.fg".
+    """
+    key = (prefix, focused)
+    table = _tables.get(key)
+    if table is None:
+        start = prefix + (".focused." if focused else ".")
+        table = {k[len(start) :]: v for k, v in _colors.items() if k.startswith(start)}
+        _tables[key] = table
+    return table
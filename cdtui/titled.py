@@ -12,12 +12,18 @@ class TitledView(View):
         super().__init__(rect)
         self._title = title
         self._inner = inner
+        if self._inner:
+            self._inner.parent = self
         self._update_inner()
 
     def on_key_press(self, key):
         if self._inner:
             self._inner.on_key_press(key)
 
+    def on_key_repeat(self, key, count):
+        if self._inner:
+            self._inner.on_key_repeat(key, count)
+
     def set_focused(self, focused):
         super().set_focused(focused)
         if self._inner:
@@ -29,8 +35,8 @@ class TitledView(View):
             self._inner.set_application(application)
 
     def set_rect(self, rect):
-        self._update_inner()
         super().set_rect(rect)
+        self._update_inner()
 
     def contains(self, child):
         return self._inner == child
@@ -46,10 +52,9 @@ class TitledView(View):
 
     def _update_inner(self):
         if self._inner:
-            inner_rect = self._rect.copy()
-            inner_rect.y += 1
-            inner_rect.height -= 1
-            self._inner.set_rect(inner_rect)
+            rect = self._rect
+            if not self._inner.rect.matches(rect.x, rect.y + 1, rect.width, rect.height - 1):
+                self._inner.set_rect(Rect(rect.x, rect.y + 1, rect.width, rect.height - 1))
 
     def update(self):
         buff = ansi.begin().gotoxy(self._rect.x, self._rect.y)
@@ -1,6 +1,6 @@
 
-from . import kbd
-from .base import COLORS, Rect
+from . import ansi, kbd, theme
+from .base import Rect
 import logging 
 
 _logger = logging.getLogger(__name__)
@@ -10,11 +10,16 @@ class View:
     def __init__(self, rect: Rect = None):
         self._focused = False
         self._rect = rect or Rect()
-        self._dirty = True
         self._application = None
+        self._parent = None
         self._visible = True
         self._focusable = True
         self._color_key_prefix = self.__class__.__name__.lower()
+        self._style = None
+        self._style_version = -1
+        # First line shown and rect on the last update, see hint_scroll()
+        self._painted_offset = None
+        self._painted_rect = None
 
     def set_application(self, application):
         self._application = application
@@ -24,6 +29,39 @@ class View:
 
     application = property(get_application, set_application)
 
+    def set_parent(self, parent: "View"):
+        self._parent = parent
+
+    def get_parent(self) -> "View":
+        return self._parent
+
+    parent = property(get_parent, set_parent)
+
+    def get_root(self) -> "View":
+        """
+        Returns the top most container of this view
+        """
+        view = self
+        while view._parent:
+            view = view._parent
+        return view
+
+    def get_depth(self) -> int:
+        depth = 0
+        parent = self._parent
+        while parent:
+            depth += 1
+            parent = parent._parent
+        return depth
+
+    def is_descendant_of(self, view: "View") -> bool:
+        parent = self._parent
+        while parent:
+            if parent is view:
+                return True
+            parent = parent._parent
+        return False
+
     def set_visible(self, visible: bool):
         self._visible = visible
 
@@ -36,7 +74,8 @@ class View:
         old_rect = self._rect
         self._rect = rect
         if old_rect != rect:
-            self._dirty = True
+            # Whatever was under the old area has to be painted again.
+            self.invalidate(old_rect)
 
     def get_rect(self) -> Rect:
         return self._rect
@@ -47,6 +86,7 @@ class View:
         old_focused = self._focused
         self._focused = focused
         if old_focused != focused:
+            self._style = None
             self.queue_update()
 
     def get_focused(self) -> bool:
@@ -64,6 +104,7 @@ class View:
 
     def set_color_key_prefix(self, color_key_prefix: str):
         self._color_key_prefix = color_key_prefix
+        self._style = None
 
     def get_color_key_prefix(self) -> str:
         return self._color_key_prefix
@@ -74,7 +115,11 @@ class View:
         return self._color_key_prefix + (".focused" if self.focused else "") + "." + color
 
     def get_color(self, key) -> str:
-        return COLORS.get(self.get_color_key(key), "")
+        style = self._style
+        if style is None or self._style_version != theme.version:
+            style = self._style = theme.style_table(self._color_key_prefix, self._focused)
+            self._style_version = theme.version
+        return style.get(key, "")
 
     def contains(self, child) -> bool:
         return False
@@ -82,9 +127,43 @@ class View:
     def on_key_press(self, key):
         pass
 
+    def on_key_repeat(self, key, count: int):
+        """
+        Handles count consecutive presses of a navigation key,
+        views that can move count steps at once should override it.
+        """
+        for _ in range(count):
+            self.on_key_press(key)
+
     def update(self):
         pass
 
+    def hint_scroll(self, offset: int):
+        """
+        Called from update() by views showing lines from offset on. When
+        only the offset changed since the last update, and the view is as
+        wide as the screen, the terminal is told to shift the lines it shows
+        so only the new ones have to be sent.
+        All the lines still have to be drawn.
+        """
+        rect = self._rect
+        painted_offset = self._painted_offset
+        if painted_offset is not None and painted_offset != offset and self._application:
+            lines = offset - painted_offset
+            full_width = rect.x == 1 and rect.width == self._application.terminal.size()[1]
+            if full_width and abs(lines) < rect.height and self._painted_rect == rect:
+                ansi.begin().scroll(rect.y, rect.y + rect.height - 1, lines).put()
+        self._painted_offset = offset
+        self._painted_rect = rect.frozen()
+
+    def invalidate(self, rect: Rect = None):
+        """
+        Reports a screen area, the view's own by default, as damaged,
+        the views intersecting it get painted again.
+        """
+        if self._application:
+            self._application.add_damage(rect or self._rect)
+
     def queue_update(self):
         if self._application and self.visible:
             self._application.queue_update(self)
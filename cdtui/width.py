@@ -0,0 +1,74 @@
+import bisect
+import functools
+import re
+
+from .width_ranges import WIDE, ZERO_WIDTH
+
+_ESCAPE = re.compile(r"\x1b\[[0-?]*[ -/]*[@-~]|\x1b[@-Z\\-_]")
+_TOKEN = re.compile(r"(\x1b\[[0-?]*[ -/]*[@-~]|\x1b[@-Z\\-_])|([^\x1b]+)")
+
+
+@functools.lru_cache(maxsize=4096)
+def _lookup_width(code: int) -> int:
+    if bisect.bisect_right(ZERO_WIDTH, code) & 1:
+        return 0
+    return 2 if bisect.bisect_right(WIDE, code) & 1 else 1
+
+
+def char_width(char: str) -> int:
+    """
+    Returns how many cells a char takes: 0 for combining, control and
+    other zero width chars, 2 for wide east asian ones, 1 otherwise.
+    """
+    code = ord(char)
+    if 0x20 <= code < 0x7F:
+        return 1
+    return _lookup_width(code)
+
+
+def strip_ansi(string: str) -> str:
+    if "\u001b" not in string:
+        return string
+    return _ESCAPE.sub("", string)
+
+
+@functools.lru_cache(maxsize=4096)
+def string_width(string: str) -> int:
+    """
+    Returns how many cells a string takes once printed, escape sequences
+    take none.
+    """
+    string = strip_ansi(string)
+    if string.isascii():
+        return len(string)
+    return sum(map(char_width, string))
+
+
+def truncate(string: str, width: int) -> str:
+    """
+    Cuts the text of a string at the given display width, escape sequences
+    are kept so the attributes they set are closed properly.
+    """
+    if string.isascii() and "\u001b" not in string:
+        return string[:width]
+
+    result = []
+    remaining = width
+    for match in _TOKEN.finditer(string):
+        escape, text = match.groups()
+        if escape:
+            result.append(escape)
+        elif remaining > 0:
+            if text.isascii():
+                result.append(text[:remaining])
+                remaining -= min(len(text), remaining)
+            else:
+                for i, char in enumerate(text):
+                    char_cells = char_width(char)
+                    if char_cells > remaining:
+                        text = text[:i]
+                        remaining = 0
+                        break
+                    remaining -= char_cells
+                result.append(text)
+    return "".join(result)
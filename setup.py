@@ -18,7 +18,7 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/Carlos-Descalzi/cdtui",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=["benchmarks"]),
     install_requires=requirements,
     classifiers=[
         "Programming Language :: Python :: 3",
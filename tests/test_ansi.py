@@ -0,0 +1,48 @@
+import itertools
+
+from cdtui import ansi
+from cdtui.ansi import DEFAULT_SGR, SgrState, sgr_apply, sgr_transition
+
+STATES = [
+    DEFAULT_SGR,
+    SgrState(bold=True),
+    SgrState(dim=True, italic=True),
+    SgrState(bold=True, underline=True, reverse=True),
+    SgrState(fg="31"),
+    SgrState(fg="38;5;200", bg="48;2;1;2;3"),
+    SgrState(fg="97", bg="44", bold=True),
+]
+
+
+def params(sequence):
+    assert sequence.startswith("\x1b[") and sequence.endswith("m")
+    return sequence[2:-1]
+
+
+def test_apply():
+    assert sgr_apply(DEFAULT_SGR, "1;31") == SgrState(fg="31", bold=True)
+    assert sgr_apply(SgrState(fg="31", bold=True), "") == DEFAULT_SGR
+    assert sgr_apply(DEFAULT_SGR, "38;5;12;4") == SgrState(fg="38;5;12", underline=True)
+    assert sgr_apply(SgrState(bold=True, dim=True, fg="31"), "22;39") == DEFAULT_SGR
+
+
+def test_transitions_reach_the_new_state():
+    for old, new in itertools.product(STATES, repeat=2):
+        sequence = sgr_transition(old, new)
+        if old == new:
+            assert sequence == ""
+        else:
+            assert sgr_apply(old, params(sequence)) == new, (old, new, sequence)
+
+
+def test_transition_from_unknown_state_resets():
+    for new in STATES:
+        sequence = sgr_transition(None, new)
+        assert sequence.startswith("\x1b[0")
+        assert sgr_apply(SgrState(bold=True, reverse=True, bg="41"), params(sequence)) == new
+
+
+def test_transitions_are_incremental():
+    assert sgr_transition(SgrState(fg="31", bold=True), SgrState(fg="32", bold=True)) == "\x1b[32m"
+    assert sgr_transition(SgrState(bold=True), DEFAULT_SGR) in ("\x1b[22m", "\x1b[0m")
+    assert sgr_transition(DEFAULT_SGR, SgrState(reverse=True)) == ansi.REVERSE
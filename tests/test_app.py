@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+
+import cdtui.app
+from cdtui import Application, HeadlessTerminal, InputDialog, KeyScript, QuestionDialog, TextView
+from cdtui.base import Rect
+
+
+def background(terminal, app):
+    text_view = TextView(text="\n".join("x" * terminal.screen.width for _ in range(terminal.screen.height)))
+    app.add_component(text_view)
+    text_view.set_rect(Rect(1, 1, terminal.screen.width, terminal.screen.height))
+    return text_view
+
+
+def test_popup_closed_while_queued():
+    terminal = HeadlessTerminal(40, 10)
+    app = Application(terminal=terminal)
+    background(terminal, app)
+    dialog = InputDialog("Name?", lambda text: app.close_popup())
+    # Typing and confirming in one read closes the popup with its input queued
+    KeyScript(terminal).call(app.open_popup, dialog).keys("abc\r").run(app)
+    assert terminal.screen.lines() == ["x" * 40] * 10
+
+
+def test_closing_popup_uncovers_what_was_under_it():
+    terminal = HeadlessTerminal(40, 10)
+    app = Application(terminal=terminal)
+    background(terminal, app)
+    shown = []
+    dialog = QuestionDialog("Title", "Question?")
+    script = KeyScript(terminal).call(app.open_popup, dialog)
+    script.call(lambda: shown.append(terminal.screen.find("Question?")))
+    script.call(app.close_popup).call(lambda: shown.append(terminal.screen.lines())).run(app)
+    assert shown[0] is not None
+    assert shown[1] == ["x" * 40] * 10
+
+
+class WakeupRace:
+    """
+    Stands for the os module in cdtui.app, a worker thread wakes the
+    application up right as it starts draining the wakeup pipe.
+    """
+
+    def __init__(self, app):
+        self._app = app
+        self.raced = False
+
+    def __getattr__(self, name):
+        return getattr(os, name)
+
+    def read(self, fd, size):
+        if not self.raced and fd == self._app._wakeup_fds[0]:
+            self.raced = True
+            worker = threading.Thread(target=self._app.call_soon_threadsafe, args=(lambda: None,))
+            worker.start()
+            worker.join()
+        return os.read(fd, size)
+
+
+def test_wakeup_during_drain_is_not_lost(monkeypatch):
+    terminal = HeadlessTerminal(40, 10)
+    app = Application(terminal=terminal)
+    background(terminal, app)
+    race = WakeupRace(app)
+    monkeypatch.setattr(cdtui.app, "os", race)
+    stalled = threading.Event()
+    stopped = threading.Event()
+
+    def worker():
+        app.call_soon_threadsafe(lambda: None)
+        while not race.raced:
+            time.sleep(0.001)
+        time.sleep(0.05)
+        app.stop()
+        if not stopped.wait(5):
+            # The loop sleeps through the wakeups, a key gets it going
+            stalled.set()
+            terminal.send("x")
+
+    app.call_soon_threadsafe(threading.Thread(target=worker, daemon=True).start)
+    app.main_loop()
+    stopped.set()
+    assert race.raced
+    assert not stalled.is_set()
+
+
+def test_closed_input_is_not_read_again():
+    terminal = HeadlessTerminal(40, 10)
+    app = Application(terminal=terminal)
+    text_view = background(terminal, app)
+    reads = []
+    read = terminal.read
+
+    def counted_read():
+        reads.append(None)
+        return read()
+
+    terminal.read = counted_read
+    shown = []
+    script = KeyScript(terminal).keys("a").call(terminal.close_input).wait(0.2)
+    # The application still paints what other threads change
+    script.call(threading.Thread(target=text_view.set_text, args=("after",)).start).wait(0.1)
+    script.call(lambda: shown.append(terminal.screen.line(0))).run(app)
+    assert len(reads) <= 3
+    assert shown[0].rstrip() == "after"
+
+
+class CountingView(TextView):
+    def __init__(self, text):
+        super().__init__(text=text)
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+        super().update()
+
+
+def test_damage_repaints_only_the_views_under_it():
+    terminal = HeadlessTerminal(20, 6)
+    app = Application(terminal=terminal)
+    top, bottom, overlay = CountingView("top"), CountingView("bottom"), CountingView("overlay")
+    for view, rect in ((top, Rect(1, 1, 20, 3)), (bottom, Rect(1, 4, 20, 3)), (overlay, Rect(5, 2, 8, 1))):
+        app.add_component(view)
+        view.set_rect(rect)
+    shown = []
+
+    def remove_overlay():
+        top.updates = bottom.updates = 0
+        app.remove_component(overlay)
+
+    KeyScript(terminal).call(remove_overlay).call(lambda: shown.append(terminal.screen.lines())).run(app)
+    assert (top.updates, bottom.updates) == (1, 0)
+    assert "overlay" not in "".join(shown[0])
+    assert shown[0][0].startswith("top")
+
+
+def test_moved_view_uncovers_its_old_area():
+    terminal = HeadlessTerminal(20, 6)
+    app = Application(terminal=terminal)
+    background(terminal, app)
+    moving = TextView(text="moving")
+    app.add_component(moving)
+    moving.set_rect(Rect(1, 1, 10, 1))
+    shown = []
+    script = KeyScript(terminal).call(lambda: shown.append(terminal.screen.line(0)))
+    script.call(lambda: moving.set_rect(Rect(1, 6, 10, 1)) or moving.queue_update())
+    script.call(lambda: shown.append(terminal.screen.lines())).run(app)
+    assert shown[0].startswith("moving")
+    assert shown[1][0] == "x" * 20
+    assert shown[1][5].startswith("moving")
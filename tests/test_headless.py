@@ -0,0 +1,29 @@
+from cdtui import Application, DefaultListModel, Flex, HeadlessTerminal, KeyScript, ListView, VBox, kbd
+
+
+def test_list_navigation():
+    terminal = HeadlessTerminal(40, 10)
+    app = Application(terminal=terminal)
+    list_view = ListView(model=DefaultListModel([f"item {i}" for i in range(100)]))
+    app.set_layout(VBox().add(list_view, Flex()))
+    shown = []
+    script = KeyScript(terminal).call(lambda: shown.append(terminal.screen.find("item 0")))
+    # The first press selects item 0
+    script.keys(*[kbd.KEY_DOWN] * 16).call(lambda: shown.append(terminal.screen.find("item 0")))
+    script.call(lambda: shown.append(terminal.screen.find("item 15"))).run(app)
+    assert shown[0] == (0, 0)
+    assert shown[1] is None
+    assert shown[2] is not None
+    assert list_view._current_index == 15
+
+
+def test_virtual_screen_tabs_and_scroll():
+    terminal = HeadlessTerminal(20, 3)
+    terminal.write("a\tb\r\n\x07c\r\nd\r\ne")
+    terminal.flush()
+    assert terminal.screen.lines() == ["c".ljust(20), "d".ljust(20), "e".ljust(20)]
+    # TAB moves without erasing
+    terminal.write("\x1b[1;1H\tb")
+    terminal.flush()
+    assert terminal.screen.line(0) == "c       b".ljust(20)
+    assert terminal.screen.cursor == (9, 0)
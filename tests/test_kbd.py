@@ -0,0 +1,49 @@
+from cdtui import kbd
+from cdtui.kbd import KeyDecoder
+
+
+def test_plain_chars():
+    assert KeyDecoder().feed(b"ab\r") == [ord("a"), ord("b"), kbd.KEY_ENTER]
+
+
+def test_csi_and_ss3_sequences():
+    decoder = KeyDecoder()
+    assert decoder.feed(b"\x1b[A\x1bOB\x1b[5~\x1b[Z") == [kbd.KEY_UP, kbd.KEY_DOWN, kbd.KEY_PGUP, kbd.KEY_SHIFT_TAB]
+    assert not decoder.pending
+
+
+def test_sequence_split_across_feeds():
+    decoder = KeyDecoder()
+    assert decoder.feed(b"x\x1b[") == [ord("x")]
+    assert decoder.pending
+    assert decoder.feed(b"6") == []
+    assert decoder.feed(b"~") == [kbd.KEY_PGDN]
+    assert not decoder.pending
+
+
+def test_utf8_split_across_feeds():
+    decoder = KeyDecoder()
+    data = "ñ".encode()
+    assert decoder.feed(data[:1]) == []
+    assert decoder.feed(data[1:]) == [ord("ñ")]
+
+
+def test_lone_escape_on_flush():
+    decoder = KeyDecoder()
+    assert decoder.feed(b"\x1b") == []
+    assert decoder.flush() == [kbd.KEY_ESC]
+    assert not decoder.pending
+
+
+def test_double_escape_and_alt_key():
+    assert KeyDecoder().feed(b"\x1b\x1b") == [kbd.KEY_ESC]
+    assert KeyDecoder().feed(b"\x1bx") == [kbd.keystroke([27, ord("x")])]
+
+
+def test_unknown_sequence_kept_whole():
+    assert KeyDecoder().feed(b"\x1b[15~") == [kbd.keystroke_from_str("\x1b[15~")]
+
+
+def test_key_sequence_round_trip():
+    for key in (kbd.KEY_UP, kbd.KEY_HOME, kbd.KEY_PGDN, ord("q"), kbd.KEY_ENTER):
+        assert KeyDecoder().feed(kbd.key_sequence(key).encode()) == [key]
@@ -0,0 +1,33 @@
+from cdtui import Fixed, Flex, HBox, Percent, VBox, View
+from cdtui.base import Rect
+from cdtui.layout import solve
+
+
+def test_fixed_and_percent():
+    assert solve([Fixed(10), Percent(50)], 100) == [10, 50]
+
+
+def test_flex_splits_the_rest_by_weight():
+    assert solve([Fixed(10), Flex(1), Flex(3)], 90) == [10, 20, 60]
+
+
+def test_flex_leftover_goes_to_first_items():
+    assert solve([Flex(), Flex(), Flex()], 10) == [4, 3, 3]
+
+
+def test_flex_bounds_are_respected():
+    assert solve([Flex(max_size=5), Flex()], 50) == [5, 45]
+    assert solve([Flex(min_size=30), Flex()], 40) == [30, 10]
+
+
+def test_no_room_left():
+    assert solve([Fixed(30), Flex()], 20) == [30, 0]
+
+
+def test_nested_boxes_apply_rects():
+    top, left, right = View(), View(), View()
+    layout = VBox().add(top, Fixed(2)).add(HBox().add(left, Percent(25)).add(right, Flex()), Flex())
+    layout.apply(Rect(1, 1, 80, 24))
+    assert (top.rect.x, top.rect.y, top.rect.width, top.rect.height) == (1, 1, 80, 2)
+    assert (left.rect.x, left.rect.y, left.rect.width, left.rect.height) == (1, 3, 20, 22)
+    assert (right.rect.x, right.rect.y, right.rect.width, right.rect.height) == (21, 3, 60, 22)
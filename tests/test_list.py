@@ -0,0 +1,187 @@
+import threading
+
+from cdtui import (
+    COLORS,
+    Application,
+    DefaultListModel,
+    Flex,
+    HeadlessTerminal,
+    KeyScript,
+    LazyListModel,
+    ListModel,
+    ListView,
+    VBox,
+    ansi,
+    set_theme,
+)
+
+TIMEOUT = 5
+
+
+class Fetcher:
+    """
+    fetch() for LazyListModel that waits to be released, so tests can
+    queue requests while the loader is busy.
+    """
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+        self.loaded = []
+        self.release = threading.Event()
+
+    def __call__(self, start, stop):
+        self.release.wait(TIMEOUT)
+        self.loaded.append(start // self.page_size)
+        return [f"item {i}" for i in range(start, stop)]
+
+
+def wait_for_pages(model, count):
+    done = threading.Event()
+    changed = []
+
+    def on_range_changed(_, start, stop):
+        changed.append((start, stop))
+        if len(changed) == count:
+            done.set()
+
+    model.on_range_changed.add(on_range_changed)
+    return done, changed
+
+
+def test_placeholders_until_loaded():
+    fetch = Fetcher(10)
+    fetch.release.set()
+    model = LazyListModel(100, fetch, page_size=10, prefetch=0, placeholder="...")
+    done, changed = wait_for_pages(model, 2)
+    assert model.get_items(5, 15) == ["..."] * 10
+    assert done.wait(TIMEOUT)
+    assert sorted(changed) == [(0, 10), (10, 20)]
+    assert model.get_items(5, 15) == [f"item {i}" for i in range(5, 15)]
+    assert sorted(fetch.loaded) == [0, 1]
+
+
+def test_latest_request_loads_first():
+    fetch = Fetcher(50)
+    model = LazyListModel(1000, fetch, page_size=50, prefetch=0)
+    done, _ = wait_for_pages(model, 4)
+    model.get_items(0, 1)
+    # Wait for the loader to take page 0, the rest queue behind it
+    while model._loading != 0:
+        threading.Event().wait(0.001)
+    model.get_items(100, 101)
+    model.get_items(50, 51)
+    model.get_items(150, 151)
+    model.get_items(100, 101)
+    fetch.release.set()
+    assert done.wait(TIMEOUT)
+    assert fetch.loaded == [0, 2, 3, 1]
+
+
+def test_get_items_past_the_end():
+    fetch = Fetcher(10)
+    fetch.release.set()
+    model = LazyListModel(15, fetch, page_size=10)
+    assert len(model.get_items(10, 30)) == 5
+    assert model.get_items(20, 30) == []
+
+
+def test_default_get_items_uses_get_item():
+    class SquaresModel(ListModel):
+        def get_item_count(self):
+            return 10
+
+        def get_item(self, index):
+            return index * index
+
+    assert SquaresModel().get_items(2, 5) == [4, 9, 16]
+
+
+def test_default_model_get_items():
+    model = DefaultListModel([1, 2, 3, 4])
+    assert model.get_items() == [1, 2, 3, 4]
+    assert model.get_items(1, 3) == [2, 3]
+
+
+def test_invalidate_while_fetching():
+    fetch = Fetcher(10)
+    model = LazyListModel(100, fetch, page_size=10, prefetch=0, placeholder="...")
+    model.get_items(0, 3)
+    while model._loading != 0:
+        threading.Event().wait(0.001)
+    done, changed = wait_for_pages(model, 3)
+    model.invalidate()
+    # Views asking again while the stale page is still being fetched
+    model.get_items(0, 3)
+    fetch.release.set()
+    assert done.wait(TIMEOUT)
+    assert fetch.loaded == [0, 0]
+    assert model.get_items(0, 3) == ["item 0", "item 1", "item 2"]
+
+
+def test_set_item_count_while_fetching():
+    fetch = Fetcher(10)
+    model = LazyListModel(100, fetch, page_size=10, prefetch=0, placeholder="...")
+    model.get_items(0, 3)
+    while model._loading != 0:
+        threading.Event().wait(0.001)
+    done, changed = wait_for_pages(model, 1)
+    model.set_item_count(50)
+    fetch.release.set()
+    # The stale page is reported so views ask for it again
+    assert done.wait(TIMEOUT)
+    assert changed == [(0, 10)]
+    done, _ = wait_for_pages(model, 1)
+    model.get_items(0, 3)
+    assert done.wait(TIMEOUT)
+    assert model.get_items(0, 3) == ["item 0", "item 1", "item 2"]
+
+
+
+def run_list_view(items, renderer, *steps):
+    """
+    Shows a list on a headless application, returns the screen cells
+    after each step.
+    """
+    terminal = HeadlessTerminal(30, 5)
+    app = Application(terminal=terminal)
+    view = ListView(model=DefaultListModel(items))
+    view.set_item_renderer(renderer)
+    app.set_layout(VBox().add(view, Flex()))
+    shown = []
+    script = KeyScript(terminal)
+    for step in steps:
+        script.call(step, app, view).call(lambda: shown.append([terminal.screen.cell(0, y) for y in range(3)]))
+    script.run(app)
+    return shown
+
+
+def test_rows_are_rendered_once():
+    rendered = []
+
+    def renderer(view, item):
+        rendered.append(item)
+        return item
+
+    shown = run_list_view(["a", "b", "c"], renderer, lambda app, view: None, lambda app, view: view.queue_update())
+    assert shown[1] == shown[0]
+    assert sorted(rendered) == ["a", "b", "c"]
+
+
+def test_rows_are_rendered_again_on_theme_change():
+    colors = dict(COLORS)
+
+    def renderer(view, item):
+        return view.get_color("item") + item + ansi.RESET
+
+    def set_red(app, view):
+        app.set_theme(dict(colors, **{"listview.item": "\x1b[31m"}))
+
+    def set_green(app, view):
+        app.set_theme(dict(colors, **{"listview.item": "\x1b[32m"}))
+
+    try:
+        shown = run_list_view(["a", "b", "c"], renderer, set_red, set_green)
+    finally:
+        set_theme(COLORS)
+    assert [attr.fg for _, attr in shown[0][1:]] == ["31", "31"]
+    assert [attr.fg for _, attr in shown[1][1:]] == ["32", "32"]
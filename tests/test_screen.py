@@ -0,0 +1,84 @@
+from cdtui import ansi
+from cdtui.headless import VirtualScreen
+from cdtui.screen import Screen
+
+
+def render(screen, terminal):
+    output = screen.render()
+    terminal.write(output)
+    assert terminal.lines() == [screen.line(y) for y in range(screen.height)]
+    for y in range(screen.height):
+        for x in range(screen.width):
+            assert terminal.cell(x, y) == screen.cell(x, y)
+    return output
+
+
+def test_render_shows_back_buffer():
+    screen, terminal = Screen(20, 4), VirtualScreen(20, 4)
+    screen.write(ansi.cup(1, 1) + "hello" + ansi.cup(3, 2) + ansi.BOLD + "world" + ansi.RESET)
+    render(screen, terminal)
+    assert terminal.text() == "hello\n  world\n\n"
+    assert terminal.cell(2, 1)[1].bold
+
+
+def test_only_changes_are_written():
+    screen, terminal = Screen(20, 4), VirtualScreen(20, 4)
+    screen.write(ansi.cup(1, 1) + "hello world")
+    render(screen, terminal)
+    assert screen.render() == ""
+    screen.write(ansi.cup(1, 1) + "hello there")
+    output = render(screen, terminal)
+    assert "hello" not in output and "there" in output
+    assert terminal.line(0).startswith("hello there")
+
+
+def test_frames_end_with_default_attributes():
+    screen, terminal = Screen(10, 2), VirtualScreen(10, 2)
+    screen.write(ansi.cup(1, 1) + ansi.REVERSE + "x")
+    render(screen, terminal)
+    terminal.write(ansi.CLRSCR)
+    assert terminal.cell(0, 0)[1] == ansi.DEFAULT_SGR
+
+
+def test_wide_chars():
+    screen, terminal = Screen(6, 1), VirtualScreen(6, 1)
+    screen.write(ansi.cup(1, 1) + "a中b")
+    render(screen, terminal)
+    assert terminal.line(0) == "a中b  "
+    screen.write(ansi.cup(3, 1) + "x")
+    render(screen, terminal)
+    # Half a wide char can't be shown
+    assert terminal.line(0) == "a xb  "
+
+
+def test_tabs_and_control_chars():
+    screen, terminal = Screen(20, 1), VirtualScreen(20, 1)
+    screen.write(ansi.cup(1, 1) + "a\tb\x07c\x7f\rd")
+    render(screen, terminal)
+    assert terminal.line(0).rstrip() == "a       bcd"
+
+
+def test_surfaces_cover_base_layer():
+    screen, terminal = Screen(10, 3), VirtualScreen(10, 3)
+    screen.write("".join(ansi.cup(1, y + 1) + "." * 10 for y in range(3)))
+    surface = screen.push_surface(2, 1, 4, 1)
+    screen.set_target(surface)
+    screen.write(ansi.cup(3, 2) + "popup!")
+    screen.set_target(None)
+    render(screen, terminal)
+    assert terminal.line(1) == "..popu...."
+    screen.remove_surface(surface)
+    render(screen, terminal)
+    assert terminal.line(1) == "." * 10
+
+
+def test_scroll_hint_shifts_rows():
+    screen, terminal = Screen(10, 5), VirtualScreen(10, 5)
+    screen.write("".join(ansi.cup(1, y + 1) + f"line {y}" for y in range(5)))
+    render(screen, terminal)
+    screen.write(ansi.scroll_region(2, 5, 1))
+    screen.write("".join(ansi.cup(1, y + 1) + f"line {y + 1}".ljust(10) for y in range(1, 5)))
+    output = render(screen, terminal)
+    assert output.startswith(ansi.scroll_region(2, 5, 1))
+    assert "line 2" not in output and "line 5" in output
+    assert terminal.lines()[0].rstrip() == "line 0"
@@ -0,0 +1,19 @@
+from cdtui import Application, DefaultListModel, HeadlessTerminal, KeyScript, ListView, TabbedView, kbd
+from cdtui.base import Rect
+
+
+def test_only_the_active_tab_paints():
+    terminal = HeadlessTerminal(40, 10)
+    app = Application(terminal=terminal)
+    first = DefaultListModel([f"one {i}" for i in range(20)])
+    second = DefaultListModel([f"two {i}" for i in range(20)])
+    tabs = TabbedView(Rect(1, 1, 40, 10))
+    tabs.add_tab("first", ListView(model=first))
+    tabs.add_tab("second", ListView(model=second))
+    app.add_component(tabs)
+    shown = []
+    script = KeyScript(terminal).call(second.set_items, [f"TWO {i}" for i in range(20)])
+    script.call(lambda: shown.append(terminal.screen.text()))
+    script.call(tabs.on_key_press, kbd.KEY_RIGHT).call(lambda: shown.append(terminal.screen.text())).run(app)
+    assert "one 0" in shown[0] and "TWO" not in shown[0]
+    assert "TWO 0" in shown[1] and "one" not in shown[1]